@@ -8,17 +8,19 @@ from src.ui_elements.simple_nav import create_sidebar_navigation
 from pathlib import Path
 
 # 从settings.py导入所需配置
-from src.config.settings import VIDEO_ANALYSIS_DIR
+from src.config.settings import VIDEO_ANALYSIS_DIR, create_directories
 
 # 确保所有必要的目录结构存在
-os.makedirs('logs', exist_ok=True)
-os.makedirs(os.path.join('data', 'raw'), exist_ok=True)
-os.makedirs(os.path.join('data', 'processed'), exist_ok=True)
-os.makedirs(os.path.join('data', 'cache'), exist_ok=True)
-os.makedirs(os.path.join('data', 'dimensions'), exist_ok=True)
-os.makedirs(os.path.join('data', 'hotwords'), exist_ok=True)
-os.makedirs(os.path.join(VIDEO_ANALYSIS_DIR, 'results'), exist_ok=True)
-os.makedirs(os.path.join('data', 'temp'), exist_ok=True)
+create_directories([
+    'logs',
+    os.path.join('data', 'raw'),
+    os.path.join('data', 'processed'),
+    os.path.join('data', 'cache'),
+    os.path.join('data', 'dimensions'),
+    os.path.join('data', 'hotwords'),
+    os.path.join(VIDEO_ANALYSIS_DIR, 'results'),
+    os.path.join('data', 'temp'),
+])
 
 # 设置日志配置
 logging.basicConfig(
@@ -46,6 +48,10 @@ if api_key:
 else:
     logger.warning("无法从.env文件加载DASHSCOPE_API_KEY")
 
+# 后台预热语义匹配模型，用户进入搜索页时模型已就绪
+from utils.analyzer import start_warmup
+start_warmup()
+
 def main():
     """
     简化的主应用入口函数，通过自动跳转到视频内容智能搜索页面
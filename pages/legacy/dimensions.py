@@ -3,7 +3,8 @@ import os
 import json
 import logging
 import sys
-import glob  # Import glob
+import re
+import fnmatch
 from datetime import datetime
 from src.config.settings import DIMENSIONS_DIR, INITIAL_DIMENSION_FILENAME
 from src.ui_elements.dimension_editor import render_dimension_editor, save_template  # Removed apply_template, load_default_templates, get_template_names, delete_template
@@ -15,12 +16,20 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 模板文件名匹配规则，与glob('*.json')一致：忽略隐藏文件
+_TEMPLATE_FILE_PATTERN = re.compile(r'(?!\.)' + fnmatch.translate('*.json'))
+
 def get_available_templates():
     """获取data/dimensions目录下所有json模板文件名"""
-    template_files = glob.glob(os.path.join(DIMENSIONS_DIR, '*.json'))
-    # 提取文件名（不含扩展名）作为模板名
-    template_names = [os.path.splitext(os.path.basename(f))[0] for f in template_files]
-    return template_names
+    # 单次scandir遍历，按文件名匹配，不构造完整路径列表
+    try:
+        with os.scandir(DIMENSIONS_DIR) as entries:
+            return [
+                entry.name[:-len('.json')] for entry in entries
+                if _TEMPLATE_FILE_PATTERN.match(entry.name) and entry.is_file()
+            ]
+    except OSError:
+        return []
 
 def load_dimension_template(template_name):
     """根据模板名称加载维度模板文件"""
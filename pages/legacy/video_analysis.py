@@ -4,7 +4,10 @@ import json
 import pandas as pd
 import logging
 import sys
+import re
+import fnmatch
 from datetime import datetime
+from collections import defaultdict
 import time
 from src.ui_elements.simple_nav import create_sidebar_navigation
 import urllib.parse
@@ -78,13 +81,37 @@ os.makedirs(ANALYSIS_RESULTS_DIR, exist_ok=True)
 
 from src.ui_elements.custom_theme import set_custom_theme
 
+# 模板文件名匹配规则，与glob('*.json')一致：忽略隐藏文件
+_TEMPLATE_FILE_PATTERN = re.compile(r'(?!\.)' + fnmatch.translate('*.json'))
+
 def get_available_templates():
     """获取data/dimensions目录下所有json模板文件名"""
-    import glob
-    template_files = glob.glob(os.path.join(DIMENSIONS_DIR, '*.json'))
-    # 提取文件名（不含扩展名）作为模板名
-    template_names = [os.path.splitext(os.path.basename(f))[0] for f in template_files]
-    return template_names
+    # 单次scandir遍历，按文件名匹配，不构造完整路径列表
+    try:
+        with os.scandir(DIMENSIONS_DIR) as entries:
+            return [
+                entry.name[:-len('.json')] for entry in entries
+                if _TEMPLATE_FILE_PATTERN.match(entry.name) and entry.is_file()
+            ]
+    except OSError:
+        return []
+
+
+def _group_matches(matches, key):
+    """
+    按字段一次性分组匹配结果，替代按每个维度/关键词重复扫描全部匹配
+
+    参数:
+        matches: 匹配结果列表
+        key: 分组字段名
+
+    返回:
+        字段值到匹配列表的字典，组内保持原有顺序
+    """
+    groups = defaultdict(list)
+    for match in matches:
+        groups[match.get(key, '')].append(match)
+    return groups
 
 def load_dimension_template(template_name):
     """根据模板名称加载维度模板文件"""
@@ -472,17 +499,21 @@ def show_analysis_results(results, result_file):
         tab_id = 0
         
         # 按维度分组显示
+        matches_by_dim1 = _group_matches(
+            results['matches'], 'dimension_level1')
         for dim1 in results.get('dimensions', {}).get('level1', []):
             # 过滤出当前一级维度的匹配
-            dim1_matches = [m for m in results['matches'] if m['dimension_level1'] == dim1]
+            dim1_matches = matches_by_dim1.get(dim1, [])
             
             if dim1_matches:
                 # 使用expander显示一级维度
                 with st.expander(f"{dim1} ({len(dim1_matches)}个匹配)", expanded=False):
                     # 按二级维度分组并直接显示内容，而不是再使用嵌套的expander
+                    matches_by_dim2 = _group_matches(
+                        dim1_matches, 'dimension_level2')
                     for dim2 in results.get('dimensions', {}).get('level2', {}).get(dim1, []):
                         # 过滤出当前二级维度的匹配
-                        dim2_matches = [m for m in dim1_matches if m['dimension_level2'] == dim2]
+                        dim2_matches = matches_by_dim2.get(dim2, [])
                         
                         if dim2_matches:
                             st.markdown(f"#### {dim2} ({len(dim2_matches)}个匹配)")
@@ -505,9 +536,10 @@ def show_analysis_results(results, result_file):
     
     elif results['type'] == "关键词分析":
         # 按关键词分组显示
+        matches_by_keyword = _group_matches(results['matches'], 'keyword')
         for keyword in results.get('keywords', []):
             # 过滤出当前关键词的匹配
-            keyword_matches = [m for m in results['matches'] if m['keyword'] == keyword]
+            keyword_matches = matches_by_keyword.get(keyword, [])
             
             if keyword_matches:
                 with st.expander(f"关键词: {keyword} ({len(keyword_matches)}个匹配)", expanded=False):
@@ -579,34 +611,40 @@ def show():
     def _load_oss_video_urls():
         """从export_urls.csv加载OSS视频URL列表"""
         csv_path = os.path.join("data", "input", "export_urls.csv")
-        video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm', '.flv', '.wmv']
+        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm',
+                            '.flv', '.wmv'}
         
         if os.path.exists(csv_path):
             try:
-                df = pd.read_csv(csv_path)
-                if 'object' in df.columns and 'url' in df.columns:
-                    # 过滤出视频文件
-                    video_files = []
-                    for _, row in df.iterrows():
-                        obj_name = row['object']
-                        url = row['url']
-                        file_name = os.path.basename(urllib.parse.unquote(obj_name))
-                        file_ext = os.path.splitext(file_name.lower())[1]
-                        
-                        # 检查是否为视频文件
-                        if file_ext in video_extensions:
-                            video_files.append({
-                                'file_name': file_name,
-                                'object': obj_name,
-                                'url': url
-                            })
-                    
-                    logger.info(f"从export_urls.csv成功加载了 {len(video_files)} 个视频文件")
-                    return video_files
-                else:
-                    logger.error("CSV文件格式不正确，必须包含'object'和'url'列")
+                # 只读取需要的两列；缺列时不抛异常，由下面的列检查报告
+                df = pd.read_csv(
+                    csv_path,
+                    usecols=lambda column: column in ('object', 'url'),
+                    dtype=str)
             except Exception as e:
                 logger.error(f"读取OSS URL列表失败: {str(e)}")
+                return []
+            if 'object' not in df.columns or 'url' not in df.columns:
+                logger.error("CSV文件格式不正确，必须包含'object'和'url'列")
+                return []
+            # 同一对象重复导出时只保留第一条，避免重复分析
+            df = df.dropna(subset=['object']).drop_duplicates(
+                subset=['object'])
+
+            # 按列整体计算文件名和扩展名，过滤出视频文件
+            file_names = (df['object'].map(urllib.parse.unquote)
+                          .str.rsplit('/', n=1).str[-1])
+            file_exts = file_names.str.lower().str.extract(
+                r'^\.*[^.].*(\.[^.]*)$', expand=False)
+            is_video = file_exts.isin(video_extensions)
+            video_files = pd.DataFrame({
+                'file_name': file_names[is_video],
+                'object': df['object'][is_video],
+                'url': df['url'][is_video]
+            }).to_dict('records')
+
+            logger.info(f"从export_urls.csv成功加载了 {len(video_files)} 个视频文件")
+            return video_files
         else:
             logger.warning(f"OSS URL列表文件不存在: {csv_path}")
         
@@ -858,17 +896,25 @@ def show():
                                     # 根据分析类型显示不同的结果（直接显示，不使用嵌套expander）
                                     if results['type'] == "维度分析":
                                         # 直接显示所有维度匹配，不使用expander
+                                        by_dim1 = _group_matches(
+                                            results['matches'],
+                                            'dimension_level1')
                                         for dim1 in results.get('dimensions', {}).get('level1', []):
                                             # 过滤出当前一级维度的匹配
-                                            dim1_matches = [m for m in results['matches'] if m['dimension_level1'] == dim1]
+                                            dim1_matches = by_dim1.get(
+                                                dim1, [])
                                             
                                             if dim1_matches:
                                                 st.markdown(f"#### {dim1} ({len(dim1_matches)}个匹配)")
                                                 
                                                 # 按二级维度分组
+                                                by_dim2 = _group_matches(
+                                                    dim1_matches,
+                                                    'dimension_level2')
                                                 for dim2 in results.get('dimensions', {}).get('level2', {}).get(dim1, []):
                                                     # 过滤出当前二级维度的匹配
-                                                    dim2_matches = [m for m in dim1_matches if m['dimension_level2'] == dim2]
+                                                    dim2_matches = by_dim2.get(
+                                                        dim2, [])
                                                     
                                                     if dim2_matches:
                                                         st.markdown(f"##### {dim2} ({len(dim2_matches)}个匹配)")
@@ -884,9 +930,12 @@ def show():
                                     
                                     elif results['type'] == "关键词分析":
                                         # 直接显示所有关键词匹配，不使用expander
+                                        by_keyword = _group_matches(
+                                            results['matches'], 'keyword')
                                         for keyword in results.get('keywords', []):
                                             # 过滤出当前关键词的匹配
-                                            keyword_matches = [m for m in results['matches'] if m['keyword'] == keyword]
+                                            keyword_matches = by_keyword.get(
+                                                keyword, [])
                                             
                                             if keyword_matches:
                                                 st.markdown(f"#### 关键词: {keyword} ({len(keyword_matches)}个匹配)")
@@ -1054,17 +1103,25 @@ def show():
                                     # 根据分析类型显示不同的结果（直接显示，不使用嵌套expander）
                                     if results['type'] == "维度分析":
                                         # 直接显示所有维度匹配，不使用expander
+                                        by_dim1 = _group_matches(
+                                            results['matches'],
+                                            'dimension_level1')
                                         for dim1 in results.get('dimensions', {}).get('level1', []):
                                             # 过滤出当前一级维度的匹配
-                                            dim1_matches = [m for m in results['matches'] if m['dimension_level1'] == dim1]
+                                            dim1_matches = by_dim1.get(
+                                                dim1, [])
                                             
                                             if dim1_matches:
                                                 st.markdown(f"#### {dim1} ({len(dim1_matches)}个匹配)")
                                                 
                                                 # 按二级维度分组
+                                                by_dim2 = _group_matches(
+                                                    dim1_matches,
+                                                    'dimension_level2')
                                                 for dim2 in results.get('dimensions', {}).get('level2', {}).get(dim1, []):
                                                     # 过滤出当前二级维度的匹配
-                                                    dim2_matches = [m for m in dim1_matches if m['dimension_level2'] == dim2]
+                                                    dim2_matches = by_dim2.get(
+                                                        dim2, [])
                                                     
                                                     if dim2_matches:
                                                         st.markdown(f"##### {dim2} ({len(dim2_matches)}个匹配)")
@@ -1080,9 +1137,12 @@ def show():
                                     
                                     elif results['type'] == "关键词分析":
                                         # 直接显示所有关键词匹配，不使用expander
+                                        by_keyword = _group_matches(
+                                            results['matches'], 'keyword')
                                         for keyword in results.get('keywords', []):
                                             # 过滤出当前关键词的匹配
-                                            keyword_matches = [m for m in results['matches'] if m['keyword'] == keyword]
+                                            keyword_matches = by_keyword.get(
+                                                keyword, [])
                                             
                                             if keyword_matches:
                                                 st.markdown(f"#### 关键词: {keyword} ({len(keyword_matches)}个匹配)")
@@ -14,13 +14,13 @@ import time
 import streamlit as st
 from pathlib import Path
 import pandas as pd
-import shutil
 from datetime import datetime
 
 # 导入项目组件
 from utils.processor import VideoProcessor
 from src.core.magic_video_service import MagicVideoService
 from src.core.magic_video_fix import video_fix_tools
+from utils import video_utils
 
 # 配置日志
 logging.basicConfig(level=logging.INFO,
@@ -58,10 +58,13 @@ st.markdown("""
 def validate_video_files(video_files):
     """验证上传的视频文件是否有效"""
     invalid_files = []
+    copy_pairs = []
+    target_dir = os.path.join("data", "test_samples", "input", "video")
+    video_utils.ensure_dir(target_dir)
     
     for video_file in video_files:
         temp_path = os.path.join("data", "temp", "videos", video_file.name)
-        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        video_utils.ensure_dir(os.path.dirname(temp_path))
         
         with open(temp_path, "wb") as f:
             f.write(video_file.getbuffer())
@@ -81,11 +84,12 @@ def validate_video_files(video_files):
                 os.remove(temp_path)
                 continue
         
-        # 复制到目标目录
-        target_dir = os.path.join("data", "test_samples", "input", "video")
-        os.makedirs(target_dir, exist_ok=True)
-        target_path = os.path.join(target_dir, video_file.name)
-        shutil.copy2(temp_path, target_path)
+        # 验证通过的文件统一复制到目标目录
+        copy_pairs.append((temp_path, os.path.join(target_dir, video_file.name)))
+
+    # 复制互不依赖，交给线程池并行执行
+    for failed_path in video_utils.copy_files(copy_pairs):
+        st.error(f"复制视频失败: {os.path.basename(failed_path)}")
     
     return invalid_files
 
@@ -4,6 +4,7 @@ import logging
 import asyncio
 from typing import Dict, Any, Optional, List, Tuple
 import os
+import bisect
 import json
 from datetime import datetime
 import sys
@@ -43,7 +44,10 @@ async def main():
         if not os.path.exists(video_dir):
             os.makedirs(video_dir, exist_ok=True)
     
-    video_files = [f for f in os.listdir(video_dir) if f.endswith('.mp4')]
+    # scandir 返回的 DirEntry 自带文件类型信息，无需额外 stat
+    with os.scandir(video_dir) as entries:
+        video_files = [entry.name for entry in entries
+                       if entry.name.endswith('.mp4') and entry.is_file()]
     
     # 步骤1：选择视频
     with st.expander("第一步：选择视频", expanded=True):
@@ -166,21 +170,29 @@ async def main():
                 # 准备所有视频的字幕数据
                 all_subtitle_dfs = []
                 
+                # 只读取一次字幕目录，排序后按前缀二分查找，避免每个视频都遍历目录
+                subtitles_dir = os.path.join('data', 'output', 'subtitles')
+                os.makedirs(subtitles_dir, exist_ok=True)
+                with os.scandir(subtitles_dir) as entries:
+                    existing_subtitles = sorted(entry.name
+                                                for entry in entries)
+
                 for video_path in video_paths:
                     video_base_name = os.path.basename(video_path).split('.')[0]
                     
                     # 获取或处理字幕
-                    subtitles_dir = os.path.join('data', 'output', 'subtitles')
-                    os.makedirs(subtitles_dir, exist_ok=True)
-                    
-                    srt_files = [f for f in os.listdir(subtitles_dir) 
-                                if f.startswith(video_base_name)]
+                    index = bisect.bisect_left(existing_subtitles,
+                                               video_base_name)
+                    has_srt_files = (
+                        index < len(existing_subtitles)
+                        and existing_subtitles[index].startswith(
+                            video_base_name))
                     
                     subtitle_df = None
                     
                     # 默认始终重新生成字幕，不使用缓存的字幕文件
                     # 检查是否有缓存的字幕文件（仅用于显示信息）
-                    if srt_files:
+                    if has_srt_files:
                         st.info(f"视频 {video_base_name} 有现有字幕文件，将使用当前热词重新生成")
                     else:
                         st.info(f"视频 {video_base_name} 没有缓存的字幕文件")
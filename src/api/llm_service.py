@@ -3,10 +3,15 @@ import json
 import httpx
 import logging
 import re
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List, Optional, Literal
 
 logger = logging.getLogger(__name__)
 
+# LLM请求连接池上限；连接失败（未发出请求前）自动重试次数
+LLM_MAX_CONNECTIONS = 32
+LLM_CONNECT_RETRIES = 3
+
 class LLMService:
     """大语言模型服务，支持DeepSeek官方API和OpenRouter API"""
     
@@ -80,8 +85,35 @@ class LLMService:
             logger.exception(f"LLM处理过程中发生错误: {str(e)}")
             return [{"error": f"LLM处理错误: {str(e)}"}] # 返回包含错误信息的列表
 
-    async def _call_deepseek_api(self, prompt: str) -> Optional[str]:
-        """调用DeepSeek官方API"""
+    def open_client(self) -> httpx.AsyncClient:
+        """
+        创建HTTP客户端，需配合 async with 使用以确保关闭连接；
+        批量请求时在同一个客户端内发送，复用keep-alive连接，避免每次重新TLS握手
+
+        返回:
+            httpx.AsyncClient 实例
+        """
+        limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                              max_keepalive_connections=LLM_MAX_CONNECTIONS)
+        return httpx.AsyncClient(
+            timeout=120.0,
+            transport=httpx.AsyncHTTPTransport(retries=LLM_CONNECT_RETRIES,
+                                               limits=limits)
+        )
+
+    @asynccontextmanager
+    async def _client_scope(self, client: Optional[httpx.AsyncClient] = None):
+        """使用调用方传入的客户端；未传入时为本次请求创建客户端，结束后关闭"""
+        if client is not None:
+            yield client
+        else:
+            async with self.open_client() as own_client:
+                yield own_client
+
+    async def _call_deepseek_api(self, prompt: str,
+                                 client: Optional[httpx.AsyncClient] = None
+                                 ) -> Optional[str]:
+        """调用DeepSeek官方API（可传入 open_client() 创建的客户端以复用连接）"""
         if not self.deepseek_api_key:
             logger.error("DeepSeek API Key未配置")
             return None
@@ -106,9 +138,10 @@ class LLMService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client: # 增加超时时间
+            async with self._client_scope(client) as http:
                 logger.info(f"发送请求到DeepSeek模型: {self.deepseek_model}")
-                response = await client.post(self.deepseek_api_url, headers=headers, json=data)
+                response = await http.post(self.deepseek_api_url,
+                                           headers=headers, json=data)
                 response.raise_for_status() # 检查HTTP错误
                 
                 result = response.json()
@@ -134,8 +167,10 @@ class LLMService:
             logger.exception(f"调用DeepSeek API时发生未知错误: {str(e)}")
             return None
 
-    async def _call_openrouter_api(self, prompt: str) -> Optional[str]:
-        """调用OpenRouter API"""
+    async def _call_openrouter_api(self, prompt: str,
+                                   client: Optional[httpx.AsyncClient] = None
+                                   ) -> Optional[str]:
+        """调用OpenRouter API（可传入 open_client() 创建的客户端以复用连接）"""
         if not self.openrouter_api_key:
             logger.error("OpenRouter API Key未配置")
             return None
@@ -162,9 +197,10 @@ class LLMService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
+            async with self._client_scope(client) as http:
                 logger.info(f"发送请求到OpenRouter模型: {self.openrouter_model}")
-                response = await client.post(self.openrouter_api_url, headers=headers, json=data)
+                response = await http.post(self.openrouter_api_url,
+                                           headers=headers, json=data)
                 response.raise_for_status()
                 
                 result = response.json()
@@ -14,46 +14,60 @@ import uuid
 
 load_dotenv()
 
+
+def create_directories(paths) -> None:
+    """
+    批量创建目录：先汇总所有路径的各级父目录并去重，再按深度从浅到深逐个mkdir，
+    共享前缀的目录只访问一次，不像逐个makedirs那样重复stat公共父目录
+
+    参数:
+        paths: 目录路径列表（str或Path）
+    """
+    unique_dirs = set()
+    for path in paths:
+        current = os.path.abspath(os.fspath(path))
+        while current not in unique_dirs:
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            unique_dirs.add(current)
+            current = parent
+    for directory in sorted(unique_dirs, key=lambda d: d.count(os.sep)):
+        try:
+            os.mkdir(directory)
+        except FileExistsError:
+            pass
+
 # 获取项目根目录的绝对路径
 ROOT_DIR = Path(__file__).parents[2].absolute()
 
 # 视频与音频相关路径
 DATA_DIR = ROOT_DIR / "data"
-DATA_DIR.mkdir(exist_ok=True)
 
 CACHE_DIR = DATA_DIR / "cache"
-CACHE_DIR.mkdir(exist_ok=True)
 
 AUDIO_CACHE_DIR = CACHE_DIR / "audio"
-AUDIO_CACHE_DIR.mkdir(exist_ok=True)
 
 VIDEO_CACHE_DIR = CACHE_DIR / "videos"
-VIDEO_CACHE_DIR.mkdir(exist_ok=True)
 
 OUTPUT_DIR = DATA_DIR / "output"
-OUTPUT_DIR.mkdir(exist_ok=True)
 
 EXPORT_DIR = DATA_DIR / "exports"
-EXPORT_DIR.mkdir(exist_ok=True)
 
 # 分析维度相关路径
 DIMENSIONS_DIR = DATA_DIR / "dimensions"
-DIMENSIONS_DIR.mkdir(exist_ok=True)
 
 # 热词与词典路径
 HOTWORDS_DIR = DATA_DIR / "hotwords"
-HOTWORDS_DIR.mkdir(exist_ok=True)
 
 # 日志相关配置
 LOG_DIR = ROOT_DIR / "logs"
-LOG_DIR.mkdir(exist_ok=True)
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_LEVEL = logging.INFO
 LOG_FILE = LOG_DIR / f"app_{datetime.now().strftime('%Y%m%d')}.log"
 
 # 错误视频日志目录
 ERROR_VIDEO_LOG_DIR = LOG_DIR / "video_errors"
-ERROR_VIDEO_LOG_DIR.mkdir(exist_ok=True)
 
 # API配置
 DASHSCOPE_API_KEY = os.getenv("DASHSCOPE_API_KEY", "")
@@ -77,6 +91,10 @@ SESSION_ID = str(uuid.uuid4())
 # API 模型配置
 DASHSCOPE_ASR_MODEL = "paraformer-v2"
 DASHSCOPE_ASR_SAMPLE_RATE = 16000
+# 转写任务轮询：首次间隔（秒），之后按指数退避翻倍直到上限，总等待超过超时时间后放弃
+DASHSCOPE_POLL_INITIAL = float(os.environ.get('DASHSCOPE_POLL_INITIAL', '1.0'))
+DASHSCOPE_POLL_MAX = float(os.environ.get('DASHSCOPE_POLL_MAX', '15.0'))
+DASHSCOPE_POLL_TIMEOUT = float(os.environ.get('DASHSCOPE_POLL_TIMEOUT', '600'))
 
 # 文件导出配置
 CSV_DELIMITER = ","
@@ -86,13 +104,9 @@ CSV_QUOTECHAR = '"'
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TEMP_DIR = os.path.join(DATA_DIR, 'temp')
 
-# 确保必要目录存在
-os.makedirs(DATA_DIR, exist_ok=True)
-os.makedirs(TEMP_DIR, exist_ok=True)
 
 # 上传目录设置
 UPLOAD_DIR = os.path.join(DATA_DIR, 'uploads')
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # 上传配置
 MAX_UPLOAD_SIZE_MB = int(os.environ.get('MAX_UPLOAD_SIZE_MB', '200'))  # 默认最大200MB
@@ -100,7 +114,6 @@ MAX_UPLOAD_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024  # 转换为字节
 
 # 视频上传配置
 VIDEO_UPLOAD_DIR = os.path.join(UPLOAD_DIR, 'videos')
-os.makedirs(VIDEO_UPLOAD_DIR, exist_ok=True)
 VIDEO_STORAGE_TYPE = os.environ.get('VIDEO_STORAGE_TYPE', 'local')  # 'local' 或 'oss'
 VIDEO_FILE_CHUNK_SIZE = int(os.environ.get('VIDEO_FILE_CHUNK_SIZE', '8192'))  # 文件读取块大小(KB)
 VIDEO_THUMB_SIZE = (320, 180)  # 视频缩略图尺寸
@@ -114,26 +127,27 @@ VIDEO_ALLOWED_FORMATS = {
     'webm': {'mimetype': 'video/webm', 'extension': '.webm'}
 }
 VIDEO_TEMP_DIR = os.path.join(TEMP_DIR, 'videos')
-os.makedirs(VIDEO_TEMP_DIR, exist_ok=True)
 
 # 视频缩略图配置
 VIDEO_THUMB_DIR = os.path.join(VIDEO_UPLOAD_DIR, 'thumbnails')
-os.makedirs(VIDEO_THUMB_DIR, exist_ok=True)
 VIDEO_THUMB_FORMAT = 'jpg'  # 缩略图格式
 VIDEO_THUMB_QUALITY = 90    # 缩略图质量 (1-100)
 VIDEO_THUMB_GENERATE = os.environ.get('VIDEO_THUMB_GENERATE', 'True').lower() in ('true', '1', 't')  # 是否生成缩略图
 
 # 视频处理配置
 VIDEO_PROCESSING_DIR = os.path.join(DATA_DIR, 'processed')
-os.makedirs(VIDEO_PROCESSING_DIR, exist_ok=True)
 VIDEO_SUBTITLE_DIR = os.path.join(VIDEO_PROCESSING_DIR, 'subtitles')
-os.makedirs(VIDEO_SUBTITLE_DIR, exist_ok=True)
 VIDEO_ANALYSIS_DIR = os.path.join(VIDEO_PROCESSING_DIR, 'analysis')
-os.makedirs(VIDEO_ANALYSIS_DIR, exist_ok=True)
 
 # 视频错误日志目录
 VIDEO_ERROR_LOG_DIR = os.path.join(LOG_DIR, 'video_errors')
-os.makedirs(VIDEO_ERROR_LOG_DIR, exist_ok=True)
+
+# 确保必要目录存在（统一批量创建）
+create_directories([
+    AUDIO_CACHE_DIR, VIDEO_CACHE_DIR, OUTPUT_DIR, EXPORT_DIR, DIMENSIONS_DIR,
+    HOTWORDS_DIR, ERROR_VIDEO_LOG_DIR, VIDEO_TEMP_DIR, VIDEO_THUMB_DIR,
+    VIDEO_SUBTITLE_DIR, VIDEO_ANALYSIS_DIR, VIDEO_ERROR_LOG_DIR
+])
 
 # 视频处理选项
 VIDEO_SPEECH_RECOGNITION_ENGINE = os.environ.get('VIDEO_SPEECH_RECOGNITION_ENGINE', 'whisper')  # 'whisper' 或 'ali_asr'
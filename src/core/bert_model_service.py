@@ -6,11 +6,17 @@ BERT模型服务：提供基于Chinese-BERT-wwm的语义分析服务，特别适
 """
 
 import os
+import math
+import hashlib
 import logging
+import threading
+from functools import lru_cache
 import numpy as np
 import torch
 from typing import List, Dict, Any, Tuple, Optional
 from transformers import BertTokenizer, BertModel
+from utils.torch_runtime import select_device, prepare_model, get_cached_model
+from utils.embedding_cache import EmbeddingLRU
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -18,6 +24,105 @@ logger = logging.getLogger(__name__)
 # 模型缓存目录
 MODELS_DIR = os.path.join("data", "models", "bert")
 
+# BERT编码的批大小
+BERT_BATCH_SIZE = 32
+
+# 跨调用缓存的文本向量条数上限（按最近使用淘汰）
+BERT_EMBEDDING_CACHE_SIZE = 4096
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(fastmath=True, cache=True)
+    def _fused_cosine_similarity(v1, v2):
+        """单次遍历同时累加点积和两个向量的平方和（JIT编译，可向量化为SIMD指令）"""
+        dot = 0.0
+        sq1 = 0.0
+        sq2 = 0.0
+        for i in range(v1.shape[0]):
+            a = v1[i]
+            b = v2[i]
+            dot += a * b
+            sq1 += a * a
+            sq2 += b * b
+        if sq1 == 0.0 or sq2 == 0.0:
+            return 0.0
+        return dot / np.sqrt(sq1 * sq2)
+else:
+    def _fused_cosine_similarity(v1, v2):
+        """点积与平方和各一次BLAS调用，只开一次方，不生成中间数组"""
+        sq = float(np.dot(v1, v1)) * float(np.dot(v2, v2))
+        if sq == 0.0:
+            return 0.0
+        return float(np.dot(v1, v2)) / math.sqrt(sq)
+
+# 备用词向量方案的拟合语料
+_FALLBACK_SAMPLE_TEXTS = (
+    "婴儿奶粉配方", "宝宝成长发育", "新生儿营养", "母乳喂养",
+    "免疫力提升", "护理保养", "婴儿辅食", "哺乳期妈妈",
+    "优质蛋白", "儿童营养", "宝宝健康", "育儿知识"
+)
+
+# jieba词典与拟合好的TF-IDF矢量器在进程内只初始化一次，所有服务实例共享
+_fallback_lock = threading.Lock()
+_jieba_initialized = False
+_fallback_vectorizer = None
+
+
+def _jieba_ready():
+    """
+    确保jieba词典已加载（进程内只加载一次）
+
+    返回:
+        jieba 模块
+    """
+    global _jieba_initialized
+    import jieba
+    if not _jieba_initialized:
+        with _fallback_lock:
+            if not _jieba_initialized:
+                jieba.initialize()
+                _jieba_initialized = True
+    return jieba
+
+
+@lru_cache(maxsize=BERT_EMBEDDING_CACHE_SIZE)
+def _jieba_tokenize(text: str) -> Tuple[str, ...]:
+    """jieba精确模式分词，重复出现的文本直接返回缓存的分词结果（模块级命名函数，可被pickle，矢量器可跨进程使用）"""
+    return tuple(_jieba_ready().lcut(text, cut_all=False))
+
+
+def _text_key(text: str) -> bytes:
+    """文本向量缓存的键：128位BLAKE2b摘要，长字幕不必整段作为字典键保存"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def _get_fallback_vectorizer():
+    """
+    获取已拟合的jieba+TF-IDF矢量器，首次调用时拟合，之后直接复用
+
+    返回:
+        拟合完成的 TfidfVectorizer
+    """
+    global _fallback_vectorizer
+    if _fallback_vectorizer is None:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        _jieba_ready()
+        with _fallback_lock:
+            if _fallback_vectorizer is None:
+                vectorizer = TfidfVectorizer(
+                    analyzer='word',
+                    tokenizer=_jieba_tokenize,
+                    max_features=100
+                )
+                vectorizer.fit(_FALLBACK_SAMPLE_TEXTS)
+                _fallback_vectorizer = vectorizer
+    return _fallback_vectorizer
+
 class BertModelService:
     """基于Chinese-BERT-wwm的语义分析服务"""
     
@@ -27,8 +132,10 @@ class BertModelService:
         os.makedirs(MODELS_DIR, exist_ok=True)
         
         self.model_name = "hfl/chinese-bert-wwm-ext"
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.device = torch.device(select_device())
         logger.info(f"使用设备: {self.device}")
+        # 文本摘要 -> CLS向量（按最近使用淘汰），同一批字幕反复计算相似度、分段时只编码一次
+        self._embedding_cache = EmbeddingLRU(BERT_EMBEDDING_CACHE_SIZE)
         
         # 初始化模型和分词器
         try:
@@ -51,40 +158,25 @@ class BertModelService:
                 logger.error(f"本地模型路径不存在: {local_model_path}")
                 raise FileNotFoundError(f"本地模型路径不存在: {local_model_path}")
                 
-            self.tokenizer = BertTokenizer.from_pretrained(local_model_path)
-            self.model = BertModel.from_pretrained(local_model_path)
-            self.model.to(self.device)
-            self.model.eval()  # 设置为评估模式
-            logger.info("BERT模型加载完成")
+            def load():
+                tokenizer = BertTokenizer.from_pretrained(local_model_path)
+                model = prepare_model(
+                    BertModel.from_pretrained(local_model_path), self.device)
+                model.eval()  # 设置为评估模式
+                logger.info("BERT模型加载完成")
+                return tokenizer, model
+
+            # 分词器和模型在进程内共享，语义服务和分析策略各自创建实例时不再重复加载
+            self.tokenizer, self.model = get_cached_model(
+                ("bert", local_model_path, str(self.device)), load)
         except Exception as e:
             logger.error(f"加载BERT模型失败: {str(e)}")
             raise
     
     def _initialize_fallback(self):
         """初始化备用的jieba词向量方案"""
-        import jieba
-        import jieba.analyse
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        
-        # 确保jieba数据加载
-        jieba.initialize()
-        
-        # 初始化TF-IDF矢量器
-        self.vectorizer = TfidfVectorizer(
-            analyzer='word',
-            tokenizer=lambda x: jieba.cut(x, cut_all=False),
-            max_features=100
-        )
-        
-        # 预编译常用词的词向量
-        sample_texts = [
-            "婴儿奶粉配方", "宝宝成长发育", "新生儿营养", "母乳喂养",
-            "免疫力提升", "护理保养", "婴儿辅食", "哺乳期妈妈",
-            "优质蛋白", "儿童营养", "宝宝健康", "育儿知识"
-        ]
-        
-        # 拟合向量化器
-        self.vectorizer.fit(sample_texts)
+        # 词典加载与矢量器拟合在进程内只做一次，后续实例直接复用
+        self.vectorizer = _get_fallback_vectorizer()
         logger.info("备用词向量方案初始化完成")
     
     def get_embeddings(self, texts: List[str]) -> np.ndarray:
@@ -103,37 +195,76 @@ class BertModelService:
             return self._get_fallback_embeddings(texts)
             
     def _get_bert_embeddings(self, texts: List[str]) -> np.ndarray:
-        """使用BERT模型获取嵌入向量"""
-        embeddings = []
-        
-        for text in texts:
+        """使用BERT模型获取嵌入向量（重复文本只编码一次，按批动态填充）"""
+        if not texts:
+            return np.array([])
+
+        # 字幕中常有重复的口播短句，去重后编码，再按索引还原到原顺序；之前调用中编码过的文本直接取缓存
+        unique_texts = list(dict.fromkeys(texts))
+        unique_embeddings = np.zeros(
+            (len(unique_texts), self.model.config.hidden_size),
+            dtype=np.float32)
+        keys = [_text_key(text) for text in unique_texts]
+        cached = self._embedding_cache.get_many(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                unique_embeddings[i] = cached[key]
+            else:
+                missing.append(i)
+        
+        for start in range(0, len(missing), BERT_BATCH_SIZE):
+            batch_indices = missing[start:start + BERT_BATCH_SIZE]
+            batch = [unique_texts[i] for i in batch_indices]
             try:
-                # 对文本进行编码
-                inputs = self.tokenizer(
-                    text, 
-                    return_tensors="pt",
-                    truncation=True,
-                    max_length=512,
-                    padding="max_length"
-                )
-                
-                # 将输入移到适当的设备
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                
-                # 获取BERT输出
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                
-                # 使用CLS token作为句子嵌入
-                sentence_embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-                embeddings.append(sentence_embedding[0])
-                
+                batch_embeddings = self._encode_bert_batch(batch)
+                unique_embeddings[batch_indices] = batch_embeddings
+                encoded = batch_indices
             except Exception as e:
-                logger.error(f"获取文本嵌入失败: {str(e)}")
-                # 返回零向量作为后备
-                embeddings.append(np.zeros(self.model.config.hidden_size))
+                logger.error(f"批量获取文本嵌入失败，逐条重试: {str(e)}")
+                encoded = []
+                for i in batch_indices:
+                    try:
+                        unique_embeddings[i] = self._encode_bert_batch(
+                            [unique_texts[i]])[0]
+                        encoded.append(i)
+                    except Exception as e:
+                        # 保留零向量作为后备，不写入缓存
+                        logger.error(f"获取文本嵌入失败: {str(e)}")
+            self._embedding_cache.put_many(
+                {keys[i]: unique_embeddings[i].copy() for i in encoded})
+
+        position = {text: i for i, text in enumerate(unique_texts)}
+        return unique_embeddings[[position[text] for text in texts]]
+
+    def _encode_bert_batch(self, batch: List[str]) -> np.ndarray:
+        """
+        编码一批文本，取CLS向量作为句子嵌入
+
+        参数:
+            batch: 文本列表
+
+        返回:
+            每行一个句子嵌入的float32数组
+        """
+        # 只填充到批内最长文本，注意力掩码屏蔽填充位，结果与填充到512一致
+        inputs = self.tokenizer(
+            batch,
+            return_tensors="pt",
+            truncation=True,
+            max_length=512,
+            padding=True
+        )
+
+        # 将输入移到适当的设备
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
         
-        return np.array(embeddings)
+        # 获取BERT输出
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+
+        # 使用CLS token作为句子嵌入
+        return outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
         
     def _get_fallback_embeddings(self, texts: List[str]) -> np.ndarray:
         """使用jieba+TF-IDF获取词向量"""
@@ -157,6 +288,15 @@ class BertModelService:
         返回:
             相似度得分 (0-1之间)
         """
+        # 空文本无语义可比，相同文本必然完全相似，都无需编码
+        if not text1 or not text2:
+            return 0.0
+        if text1 == text2:
+            return 1.0
+
+        if not self.use_bert:
+            return self._fallback_similarity(text1, text2)
+
         # 获取嵌入向量
         embeddings = self.get_embeddings([text1, text2])
         
@@ -165,15 +305,47 @@ class BertModelService:
         
         return similarity
     
-    def _cosine_similarity(self, v1: np.ndarray, v2: np.ndarray) -> float:
-        """计算两个向量的余弦相似度"""
-        norm1 = np.linalg.norm(v1)
-        norm2 = np.linalg.norm(v2)
+    def _fallback_similarity(self, text1: str, text2: str) -> float:
+        """
+        备用方案下的相似度：TF-IDF行向量已按L2单位化，直接在稀疏矩阵上做点积，
+        只遍历两段文本实际出现的词，无需展开成整个词表长度的稠密向量
         
-        if norm1 == 0 or norm2 == 0:
+        参数:
+            text1: 第一段文本
+            text2: 第二段文本
+
+        返回:
+            余弦相似度，任一文本没有词表内的词时为0
+        """
+        try:
+            vectors = self.vectorizer.transform([text1, text2])
+            return float(vectors[0].multiply(vectors[1]).sum())
+        except Exception as e:
+            logger.error(f"计算备用相似度失败: {str(e)}")
             return 0.0
+
+    def _cosine_similarity(self, v1: np.ndarray, v2: np.ndarray) -> float:
+        """计算两个向量的余弦相似度，任一向量为零时返回0"""
+        return float(_fused_cosine_similarity(np.ascontiguousarray(v1),
+                                              np.ascontiguousarray(v2)))
+
+    def _adjacent_cosine_similarities(self,
+                                      embeddings: np.ndarray) -> np.ndarray:
+        """
+        批量计算相邻向量的余弦相似度，范数与点积各一次向量化运算完成
+
+        参数:
+            embeddings: 每行一个向量的数组
             
-        return np.dot(v1, v2) / (norm1 * norm2)
+        返回:
+            长度为 len(embeddings)-1 的数组，第i项为第i与第i+1个向量的相似度；任一向量为零时记为0
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        norms = np.linalg.norm(embeddings, axis=1)
+        dots = np.einsum('ij,ij->i', embeddings[:-1], embeddings[1:])
+        denominators = norms[:-1] * norms[1:]
+        return np.divide(dots, denominators, out=np.zeros_like(dots),
+                         where=denominators > 0)
     
     def segment_ad_video(self, subtitles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -242,9 +414,12 @@ class BertModelService:
         potential_boundaries_scores = []
         window_size = min(2, max(1, len(texts) // 4)) # 根据字幕总数调整窗口大小
         
+        # 一次性计算所有相邻字幕的余弦相似度（BERT向量与TF-IDF备用向量通用）
+        adjacent_similarities = self._adjacent_cosine_similarities(embeddings)
+
         for i in range(1, len(texts)):
             # a) 语义变化得分
-            semantic_change = 1 - self._cosine_similarity(embeddings[i-1], embeddings[i])
+            semantic_change = 1 - adjacent_similarities[i-1]
             
             # b) 关键词阶段变化得分
             keyword_change_score = 0
@@ -3,14 +3,19 @@ import json
 import logging
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import re
+import threading
+from utils.config_handler import read_env_file
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 # 全局API实例
 _api_instance = None
+_api_lock = threading.Lock()
 
 class HotWordsAPI:
     """
@@ -32,6 +37,18 @@ class HotWordsAPI:
         # 设置API基础URL
         self.base_url = "https://dashscope.aliyuncs.com/api/v1/services/audio/asr/customization"
         
+        # 所有热词接口请求复用同一个会话，保持到DashScope的长连接，避免每次重新TLS握手；
+        # Retry默认不重试POST，创建热词表等非幂等请求不会因重试而重复提交
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.5,
+                              status_forcelist=(429, 500, 502, 503, 504),
+                              raise_on_status=False)
+        )
+        self.http.mount('https://', adapter)
+
         # 设置默认参数
         self.default_prefix = 'aivideo'  # 热词列表前缀
         self.default_model = 'paraformer-v2'  # 默认目标模型
@@ -133,7 +150,8 @@ class HotWordsAPI:
                     time.sleep(wait_time)
                 
                 # 发送请求
-                response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
+                response = self.http.post(self.base_url, headers=headers,
+                                          json=data, timeout=30)
                 
                 # 处理常见错误状态码
                 if response.status_code == 429:
@@ -240,7 +258,8 @@ class HotWordsAPI:
             
             # 增加超时时间，避免短时连接超时
             start_time = time.time()
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
+            response = self.http.post(self.base_url, headers=headers,
+                                      json=data, timeout=30)
             end_time = time.time()
             
             logger.info(f"API验证请求耗时: {end_time - start_time:.2f}秒")
@@ -501,7 +520,7 @@ class HotWordsAPI:
             
             logger.info(f"发送热词表创建请求: {json.dumps(payload, ensure_ascii=False)}")
             
-            response = requests.post(
+            response = self.http.post(
                 self.base_url, 
                 headers=headers, 
                 json=payload,
@@ -664,7 +683,8 @@ class HotWordsAPI:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(self.base_url, headers=headers, json=data)
+            response = self.http.post(self.base_url, headers=headers,
+                                      json=data, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -713,7 +733,8 @@ class HotWordsAPI:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(self.base_url, headers=headers, json=data)
+            response = self.http.post(self.base_url, headers=headers,
+                                      json=data, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -766,10 +787,12 @@ class HotWordsAPI:
             return False
 
 def get_api():
-    """获取API实例"""
+    """获取API实例（双重检查加锁，多线程首次调用时只创建一个实例）"""
     global _api_instance
     if _api_instance is None:
-        _api_instance = HotWordsAPI()
+        with _api_lock:
+            if _api_instance is None:
+                _api_instance = HotWordsAPI()
     return _api_instance
 
 def create_env_file(api_key=None):
@@ -793,7 +816,8 @@ def create_env_file(api_key=None):
         # 如果没有提供API密钥，创建示例模板
         if not api_key:
             # 检查是否已有配置
-            if "DASHSCOPE_API_KEY" in env_content and "sk-" in env_content:
+            existing_key = read_env_file(env_path).get("DASHSCOPE_API_KEY", "")
+            if existing_key.startswith("sk-"):
                 return True, "API密钥已配置，无需创建模板"
             
             # 创建示例模板
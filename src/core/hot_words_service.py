@@ -1,11 +1,14 @@
 import os
+import copy
 import json
 import logging
 import pandas as pd
 from typing import Dict, List, Optional, Tuple, Any, Set, Union
 from datetime import datetime
 import time
+import threading
 from src.core.hot_words_api import get_api
+from utils.config_handler import read_env_file
 from src.config.settings import HOTWORDS_DIR
 
 # 配置日志
@@ -38,6 +41,13 @@ class HotWordsService:
         self.vocabularies_cache_time = 0
         self.cache_valid_duration = 60  # 缓存有效期(秒)
         
+        # 本地热词文件缓存，文件修改时间和大小不变时不重复读取解析
+        self._hotwords_cache = None
+        self._hotwords_mtime = None
+        # 随缓存重建的反向索引：热词 -> 首个所属分类，热词表ID -> 分类
+        self._word_category_index = {}
+        self._vocabulary_category_index = {}
+
         # 初始化当前热词ID配置
         if not os.path.exists(CURRENT_HOTWORD_CONFIG):
             self._initialize_hotword_config()
@@ -81,15 +91,41 @@ class HotWordsService:
         返回:
             热词数据字典
         """
-        if os.path.exists(HOTWORDS_FILE):
+        try:
+            stat = os.stat(HOTWORDS_FILE)
+            mtime = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            self._word_category_index = {}
+            self._vocabulary_category_index = {}
+            return self._get_empty_hotwords_data()
+
+        if self._hotwords_cache is None or self._hotwords_mtime != mtime:
             try:
                 with open(HOTWORDS_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    self._hotwords_cache = json.load(f)
+                self._hotwords_mtime = mtime
+                self._rebuild_indexes()
             except Exception as e:
                 logger.error(f"加载热词文件出错: {str(e)}")
                 return self._get_empty_hotwords_data()
-        else:
-            return self._get_empty_hotwords_data()
+
+        # 调用方会直接修改返回的数据，因此返回副本
+        return copy.deepcopy(self._hotwords_cache)
+
+    def _rebuild_indexes(self):
+        """根据热词缓存重建反向索引，使按热词或热词表ID查找分类无需遍历全部分类"""
+        word_index = {}
+        categories = self._hotwords_cache.get('categories', {})
+        for category, words in categories.items():
+            for word in words:
+                word_index.setdefault(word, category)
+        self._word_category_index = word_index
+
+        vocabulary_index = {}
+        vocabulary_ids = self._hotwords_cache.get('vocabulary_ids', {})
+        for category, vocab_id in vocabulary_ids.items():
+            vocabulary_index.setdefault(vocab_id, category)
+        self._vocabulary_category_index = vocabulary_index
     
     def _get_empty_hotwords_data(self):
         """返回空的热词数据结构"""
@@ -117,6 +153,12 @@ class HotWordsService:
             with open(HOTWORDS_FILE, 'w', encoding='utf-8') as f:
                 json.dump(hotwords_data, f, ensure_ascii=False, indent=2)
             
+            # 同步更新缓存
+            self._hotwords_cache = copy.deepcopy(hotwords_data)
+            stat = os.stat(HOTWORDS_FILE)
+            self._hotwords_mtime = (stat.st_mtime_ns, stat.st_size)
+            self._rebuild_indexes()
+
             return True
         except Exception as e:
             logger.error(f"保存热词文件出错: {str(e)}")
@@ -288,12 +330,12 @@ class HotWordsService:
             
             # 检查.env文件内容
             try:
-                with open(env_path, 'r', encoding='utf-8') as f:
-                    env_content = f.read()
-                    if "DASHSCOPE_API_KEY" not in env_content:
-                        return None, "API密钥未配置，请在.env文件中添加DASHSCOPE_API_KEY=sk-您的密钥"
-                    if "DASHSCOPE_API_KEY=" in env_content and "sk-" not in env_content:
-                        return None, "API密钥格式不正确，应以'sk-'开头，请检查.env文件"
+                env_vars = read_env_file(env_path)
+                if "DASHSCOPE_API_KEY" not in env_vars:
+                    return None, ("API密钥未配置，请在.env文件中添加"
+                                  "DASHSCOPE_API_KEY=sk-您的密钥")
+                if not env_vars["DASHSCOPE_API_KEY"].startswith("sk-"):
+                    return None, "API密钥格式不正确，应以'sk-'开头，请检查.env文件"
             except Exception as e:
                 logger.error(f"读取.env文件出错: {str(e)}")
                 return None, "读取.env文件出错，请确保文件存在且有正确权限"
@@ -366,12 +408,8 @@ class HotWordsService:
             if self.api.delete_vocabulary(vocabulary_id):
                 # 删除成功后，检查本地是否有引用此ID的分类
                 hotwords_data = self.load_hotwords()
-                category_to_remove = None
-                
-                for category, vocab_id in hotwords_data.get('vocabulary_ids', {}).items():
-                    if vocab_id == vocabulary_id:
-                        category_to_remove = category
-                        break
+                category_to_remove = self._vocabulary_category_index.get(
+                    vocabulary_id)
                 
                 if category_to_remove:
                     # 移除本地记录的ID
@@ -465,10 +503,11 @@ class HotWordsService:
             if isinstance(item, str):
                 clean_text = item.strip()
                 if clean_text:  # 确保不是空字符串
+                    # 纯ASCII的热词按英文处理（isascii为C实现，无需逐字符判断）
                     formatted_vocabulary.append({
                         "text": clean_text,
                         "weight": 4,
-                        "lang": "zh"
+                        "lang": "en" if clean_text.isascii() else "zh"
                     })
             else:
                 # 尝试转换其他类型
@@ -478,7 +517,7 @@ class HotWordsService:
                         formatted_vocabulary.append({
                             "text": text,
                             "weight": 4,
-                            "lang": "zh"
+                            "lang": "en" if text.isascii() else "zh"
                         })
                 except:
                     logger.warning(f"无法转换热词项: {item}")
@@ -580,11 +619,11 @@ class HotWordsService:
 
     def delete_hot_word(self, word):
         """从任意分类中删除指定热词，找到第一个匹配即删除"""
-        hotwords_data = self.load_hotwords()
-        for category, words in hotwords_data.get('categories', {}).items():
-            if word in words:
-                # 使用现有方法删除
-                return self.delete_hotword(category, word)
+        self.load_hotwords()
+        category = self._word_category_index.get(word)
+        if category is not None:
+            # 使用现有方法删除
+            return self.delete_hotword(category, word)
         logger.warning(f"热词不存在: {word}")
         return False
 
@@ -765,10 +804,13 @@ class HotWordsService:
 
 # 单例模式
 _service_instance = None
+_service_lock = threading.Lock()
 
 def get_service():
-    """获取服务实例"""
+    """获取服务实例（双重检查加锁，多线程首次调用时只创建一个实例）"""
     global _service_instance
     if _service_instance is None:
-        _service_instance = HotWordsService()
+        with _service_lock:
+            if _service_instance is None:
+                _service_instance = HotWordsService()
     return _service_instance 
\ No newline at end of file
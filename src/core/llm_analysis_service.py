@@ -18,6 +18,9 @@ from src.api.llm_service import LLMService
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 批量分析时同时在途的LLM请求上限（受服务商限流约束）
+LLM_MAX_CONCURRENCY = 8
+
 class LLMAnalysisService:
     """基于DeepSeek V3的大语言模型分析服务"""
     
@@ -95,12 +98,14 @@ class LLMAnalysisService:
             logger.exception(f"LLM分析广告阶段时出错: {str(e)}")
             return None
             
-    async def extract_brand_keywords(self, text: str) -> List[str]:
+    async def extract_brand_keywords(self, text: str,
+                                     client=None) -> List[str]:
         """
         从文本中提取品牌关键词
         
         参数:
             text: 广告文本
+            client: 可选的共享HTTP客户端（由 LLMService.open_client() 创建）
             
         返回:
             品牌关键词列表
@@ -126,7 +131,8 @@ class LLMAnalysisService:
 """
             
             # 调用LLM服务
-            llm_result = await self.llm_service._call_deepseek_api(prompt)
+            llm_result = await self.llm_service._call_deepseek_api(
+                prompt, client=client)
             
             if not llm_result:
                 logger.warning("LLM分析返回空结果")
@@ -153,6 +159,38 @@ class LLMAnalysisService:
             logger.exception(f"LLM提取品牌关键词时出错: {str(e)}")
             return []
     
+    async def extract_brand_keywords_batch(
+            self, texts: List[str],
+            max_concurrency: int = LLM_MAX_CONCURRENCY) -> List[List[str]]:
+        """
+        并发提取多段文本的品牌关键词，总耗时接近单次请求而不是逐段累加
+
+        参数:
+            texts: 广告文本列表
+            max_concurrency: 同时在途的请求数上限
+
+        返回:
+            与texts一一对应的关键词列表，单段失败时对应位置为空列表
+        """
+        if not texts:
+            return []
+        if not self.is_available:
+            logger.warning("LLM分析服务不可用，无法提取品牌关键词")
+            return [[] for _ in texts]
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        # 整批请求共用一个客户端复用连接，结束后关闭
+        async with self.llm_service.open_client() as client:
+            async def extract_limited(text: str) -> List[str]:
+                async with semaphore:
+                    return await self.extract_brand_keywords(text,
+                                                             client=client)
+
+            logger.info(f"并发提取 {len(texts)} 段文本的品牌关键词，并发上限 {max_concurrency}")
+            return list(await asyncio.gather(
+                *(extract_limited(text) for text in texts)))
+
     def run_async_in_thread(self, coroutine: Callable[[], Coroutine]) -> Any:
         """
         在单独的线程中运行异步协程，解决事件循环嵌套问题
@@ -220,4 +258,27 @@ class LLMAnalysisService:
                 
         except Exception as e:
             logger.exception(f"同步调用LLM分析时出错: {str(e)}")
-            return None if analysis_type == 'ad_phase' else [] 
\ No newline at end of file
+            return None if analysis_type == 'ad_phase' else []
+
+    def extract_brand_keywords_batch_sync(self,
+                                          texts: List[str]) -> List[List[str]]:
+        """
+        同步方式并发提取多段文本的品牌关键词（适用于非异步上下文）
+
+        参数:
+            texts: 广告文本列表
+
+        返回:
+            与texts一一对应的关键词列表，调用失败时全部为空列表
+        """
+        try:
+            loop = asyncio.get_event_loop()
+            if loop.is_running():
+                logger.info("事件循环已在运行，使用线程执行LLM批量分析")
+                return self.run_async_in_thread(
+                    lambda: self.extract_brand_keywords_batch(texts))
+            return loop.run_until_complete(
+                self.extract_brand_keywords_batch(texts))
+        except Exception as e:
+            logger.exception(f"同步调用LLM批量分析时出错: {str(e)}")
+            return [[] for _ in texts]
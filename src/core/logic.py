@@ -3,6 +3,7 @@ import logging
 import json
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from src.core.model import TextEmbeddingModel, VideoAnalysisModel
 
@@ -80,9 +81,14 @@ class VideoProcessor:
                 "videos": []
             }
             
-            for url in urls:
-                video_result = self._process_single_video(url, dimensions, keywords, threshold)
-                results["videos"].append(video_result)
+            # 各URL的处理以等待下载/接口返回为主，用线程池并行处理，结果按输入顺序排列
+            max_workers = min(self.config.get("max_workers", 8), len(urls))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results["videos"] = list(executor.map(
+                    lambda url: self._process_single_video(
+                        url, dimensions, keywords, threshold),
+                    urls
+                ))
             
             logger.info(f"成功处理 {len(urls)} 个视频URL")
             return results
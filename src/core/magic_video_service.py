@@ -9,28 +9,457 @@ import os
 import uuid
 import time
 import json
-import shutil
 import logging
+import threading
 import subprocess
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# 可选：更快的JSON解析库
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_videoclips
 
 from utils.processor import VideoProcessor
-from utils import video_fix_tools
+from utils import video_fix_tools, video_utils, metadata_cache, temp_cleanup
 from src.core.semantic_service import SemanticAnalysisService
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 重新编码片段时统一的音频采样率和声道数，流复制的片段须与之一致才能直接拼接
+CLIP_AUDIO_SAMPLE_RATE = 44100
+CLIP_AUDIO_CHANNELS = 2
+
+# 候选视频所在目录
+VIDEO_SEARCH_DIRS = [
+    os.path.join('data', 'test_samples', 'input', 'video'),
+    os.path.join('data', 'input'),
+    os.path.join('data', 'uploads', 'videos')
+]
+
+
+def _knapsack_choices_numpy(weights: np.ndarray, values: np.ndarray,
+                            offsets: np.ndarray, capacity: int) -> np.ndarray:
+    """
+    分组0/1背包：每组最多选一个候选，返回每组在各容量下的最优选择
+
+    参数:
+        weights: 所有候选的量化时长
+        values: 所有候选的得分
+        offsets: 第g组候选位于 [offsets[g], offsets[g+1])
+        capacity: 总容量（量化单位）
+
+    返回:
+        形状为 (组数, capacity+1) 的数组，元素为组内候选序号，-1表示该组不选
+    """
+    num_groups = len(offsets) - 1
+    choices = np.full((num_groups, capacity + 1), -1, dtype=np.int64)
+    # dp[w]: 总时长不超过 w 个量化单位时的最高得分
+    dp = np.zeros(capacity + 1)
+    for g in range(num_groups):
+        new_dp = dp.copy()
+        choice = choices[g]
+        for k in range(offsets[g], offsets[g + 1]):
+            weight = weights[k]
+            if weight <= 0 or weight > capacity:
+                continue
+            candidate = dp[:capacity + 1 - weight] + values[k]
+            better = candidate > new_dp[weight:]
+            new_dp[weight:][better] = candidate[better]
+            choice[weight:][better] = k - offsets[g]
+        dp = new_dp
+    return choices
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, parallel=True)
+    def _knapsack_choices_numba(weights, values, offsets, capacity):
+        """与 _knapsack_choices_numpy 相同，编译为本地代码，容量维度并行计算"""
+        num_groups = len(offsets) - 1
+        choices = np.full((num_groups, capacity + 1), -1, dtype=np.int64)
+        dp = np.zeros(capacity + 1)
+        for g in range(num_groups):
+            new_dp = dp.copy()
+            for k in range(offsets[g], offsets[g + 1]):
+                weight = weights[k]
+                if weight <= 0 or weight > capacity:
+                    continue
+                for w in prange(weight, capacity + 1):
+                    candidate = dp[w - weight] + values[k]
+                    if candidate > new_dp[w]:
+                        new_dp[w] = candidate
+                        choices[g, w] = k - offsets[g]
+            dp = new_dp
+        return choices
+
+    _knapsack_choices = _knapsack_choices_numba
+else:
+    _knapsack_choices = _knapsack_choices_numpy
+
+
+def select_stage_matches(stage_matches: List[Tuple[str, List[Dict[str, Any]]]],
+                         target_duration: float,
+                         resolution: float = 0.1) -> Dict[str, Dict[str, Any]]:
+    """
+    在总时长不超过目标时长的前提下，为各阶段选择片段使总相似度最高（分组0/1背包动态规划）
+
+    参数:
+        stage_matches: 按顺序排列的 (阶段ID, 候选匹配列表)
+        target_duration: 目标总时长（秒）
+        resolution: 时长量化精度（秒）
+
+    返回:
+        {阶段ID: 选中的匹配}，放不下任何候选的阶段不出现在结果中
+    """
+    capacity = int(target_duration / resolution)
+    if capacity <= 0 or not stage_matches:
+        return {}
+
+    # 先把候选转换为扁平数组，动态规划内部只访问NumPy数组
+    weights = []
+    values = []
+    offsets = [0]
+    for _, matches in stage_matches:
+        for match in matches:
+            try:
+                duration = match['end_time'] - match['start_time']
+                weight = int(np.ceil(duration / resolution - 1e-9))
+            except (KeyError, TypeError):
+                weight = 0
+            weights.append(weight)
+            score = match.get('similarity', match.get('score', 0))
+            values.append(float(score or 0))
+        offsets.append(len(weights))
+
+    choices = _knapsack_choices(
+        np.array(weights, dtype=np.int64),
+        np.array(values, dtype=np.float64),
+        np.array(offsets, dtype=np.int64),
+        capacity
+    )
+
+    # 回溯得到每个阶段的选择
+    selected = {}
+    w = capacity
+    for g in range(len(stage_matches) - 1, -1, -1):
+        j = int(choices[g, w])
+        if j >= 0:
+            stage_id, matches = stage_matches[g]
+            selected[stage_id] = matches[j]
+            w -= weights[offsets[g] + j]
+    return selected
+
+
+def select_stage_matches_round_robin(
+        stage_matches: List[Tuple[str, List[Dict[str, Any]]]],
+        target_duration: float) -> Dict[str, Dict[str, Any]]:
+    """
+    按单位时长得分（相似度/时长）轮转选择片段，单次遍历即可完成，适合候选很多的情况
+
+    参数:
+        stage_matches: 按顺序排列的 (阶段ID, 候选匹配列表)
+        target_duration: 目标总时长（秒）
+
+    返回:
+        {阶段ID: 选中的匹配}，放不下任何候选的阶段不出现在结果中
+    """
+    # 每个阶段的候选得分、时长存为数组，避免逐个候选调用排序key
+    clusters = []
+    for stage_id, matches in stage_matches:
+        candidates = [m for m in matches
+                      if isinstance(m.get('start_time'), (int, float))
+                      and isinstance(m.get('end_time'), (int, float))
+                      and m['end_time'] > m['start_time']]
+        if not candidates:
+            continue
+        durations = np.fromiter(
+            (m['end_time'] - m['start_time'] for m in candidates),
+            dtype=np.float64, count=len(candidates))
+        scores = np.fromiter(
+            (float(m.get('similarity', m.get('score', 0)) or 0)
+             for m in candidates),
+            dtype=np.float64, count=len(candidates))
+        clusters.append((stage_id, candidates, durations, scores / durations))
+    if not clusters:
+        return {}
+
+    # 按各阶段最优候选的单位得分排序（一次argsort），依次为每个阶段挑放得下的最优候选
+    stage_best = np.fromiter(
+        (unit_scores.max() for _, _, _, unit_scores in clusters),
+        dtype=np.float64, count=len(clusters))
+    selected = {}
+    remaining = target_duration
+    for index in np.argsort(-stage_best, kind='stable'):
+        stage_id, candidates, durations, unit_scores = clusters[index]
+        fits = np.flatnonzero(durations <= remaining)
+        if fits.size:
+            j = fits[np.argmax(unit_scores[fits])]
+            selected[stage_id] = candidates[j]
+            remaining -= durations[j]
+        if remaining <= 0:
+            break
+    return selected
+
+
+# 候选视频元数据预热在进程内只启动一次（Streamlit每次重跑页面都会创建新的服务实例）
+_warmup_started = False
+_warmup_lock = threading.Lock()
+# 预热时按文件名登记的候选视频路径，所有服务实例共享
+_warmed_video_paths: Dict[str, str] = {}
+
+
+def _warm_metadata_cache() -> None:
+    """扫描候选视频目录，预先填充元数据缓存"""
+    for directory in VIDEO_SEARCH_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        try:
+            # 只需填充缓存，逐个消费结果而不在内存中保留整个目录的元数据；
+            # 顺带按文件名登记目录下的视频，_find_video_file 命中时无需逐个目录stat
+            count = 0
+            entries = metadata_cache.iter_directory(
+                directory, video_fix_tools.get_video_info)
+            for path, _ in entries:
+                count += 1
+                if os.path.dirname(path) == directory:
+                    # 目录按查找优先级依次扫描，已登记的文件名不被后面的目录覆盖
+                    _warmed_video_paths.setdefault(
+                        os.path.basename(path), path)
+            logger.debug(f"已预热 {directory} 下 {count} 个视频的元数据")
+        except Exception as e:
+            logger.warning(f"预热视频元数据失败: {directory}, {str(e)}")
+
+
+def start_metadata_warmup() -> None:
+    """在后台线程中预热候选视频元数据，重复调用不会重复启动"""
+    global _warmup_started
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+    threading.Thread(target=_warm_metadata_cache, name="metadata-warmup",
+                     daemon=True).start()
+
 class MagicVideoService:
     """魔法视频服务，处理视频分析与合成"""
     
-    def __init__(self):
-        """初始化服务"""
+    def __init__(self, use_gpu: bool = True):
+        """
+        初始化服务
+
+        参数:
+            use_gpu: 是否在裁剪、拼接和合成时尝试硬件解码/编码（不可用时自动回退CPU）
+        """
         self.processor = VideoProcessor()
         self.semantic_service = SemanticAnalysisService()
+        self.use_gpu = use_gpu
+        # 裁剪起点靠近关键帧时直接流复制，跳过重新编码
+        self.stream_copy = True
+        self.keyframe_tolerance = 0.5
+        # 重新编码片段时统一的输出参数（宽、高、帧率），使拼接时可直接流复制
+        self.video_params: Optional[Dict[str, Any]] = None
+        # 片段选择策略: "knapsack"（动态规划，总相似度最优）或 "round_robin"（按单位时长得分轮转，单次遍历）
+        self.selection_strategy = "knapsack"
+        # 裁剪片段等中间文件优先放在内存文件系统中，成片仍输出到 data/output
+        self.temp_root = video_utils.get_fast_temp_root(
+            os.path.join('data', 'temp', 'videos'))
+        # 视频文件查找结果缓存，以及确认找不到的视频ID
+        self._video_paths: Dict[str, str] = {}
+        self._missing_videos: set = set()
+        # 后台预热候选视频的元数据缓存，利用用户操作的间隙完成ffprobe探测（进程内只启动一次）
+        start_metadata_warmup()
+
+    def _find_video_file(self, video_id: str) -> Optional[str]:
+        """
+        在候选目录中查找视频文件，命中与未命中结果均会缓存
+
+        参数:
+            video_id: 视频ID（文件名或完整路径）
+
+        返回:
+            视频文件路径，找不到则返回None
+        """
+        if video_id in self._video_paths:
+            return self._video_paths[video_id]
+        if video_id in self._missing_videos:
+            return None
+        # 预热时登记的路径为进程级共享，文件可能已被删除，使用前确认仍存在
+        warmed_path = _warmed_video_paths.get(video_id)
+        if warmed_path and os.path.isfile(warmed_path):
+            self._video_paths[video_id] = warmed_path
+            return warmed_path
+
+        # 首先尝试在test_samples目录中查找，最后把video_id当作完整路径
+        search_paths = [os.path.join(directory, video_id)
+                        for directory in VIDEO_SEARCH_DIRS]
+        search_paths.append(video_id)
+
+        for path in search_paths:
+            if os.path.isfile(path):
+                logger.info(f"找到视频文件: {path}")
+                self._video_paths[video_id] = path
+                return path
+
+        self._missing_videos.add(video_id)
+        return None
+
+    def _matches_video_params(self, video_path: str) -> bool:
+        """
+        判断源视频是否已符合统一输出参数，符合时流复制的片段才能直接拼接
+
+        参数:
+            video_path: 源视频路径
+
+        返回:
+            未设置统一参数或源视频参数一致时返回True
+        """
+        if not self.video_params:
+            return True
+        info = metadata_cache.get_or_fetch(video_path,
+                                           video_fix_tools.get_video_info)
+        if not info or 'error' in info:
+            return False
+        video_info = info.get('video_info', {})
+        audio_info = info.get('audio_info') or {}
+        # 有音轨时须与重新编码的片段一致（AAC、44.1kHz、双声道），否则拼接后音频错乱
+        audio_matches = not audio_info.get('codec') or (
+            audio_info.get('codec') == 'aac'
+            and audio_info.get('sample_rate') == CLIP_AUDIO_SAMPLE_RATE
+            and audio_info.get('channels') == CLIP_AUDIO_CHANNELS
+        )
+        return (
+            video_info.get('codec') == 'h264'
+            and video_info.get('width') == self.video_params['width']
+            and video_info.get('height') == self.video_params['height']
+            and round(video_info.get('fps', 0), 3)
+            == round(self.video_params['fps'], 3)
+            and audio_matches
+        )
+
+    def _extract_clip(self, video_path: str, start_time: float,
+                      end_time: float, output_path: str) -> bool:
+        """
+        使用FFmpeg裁剪视频片段：起点靠近关键帧时流复制，否则重新编码（可用时使用硬件编码）
+
+        参数:
+            video_path: 源视频路径
+            start_time: 开始时间（秒）
+            end_time: 结束时间（秒）
+            output_path: 输出片段路径
+
+        返回:
+            裁剪是否成功
+        """
+        if self.stream_copy and self._matches_video_params(video_path):
+            keyframe = video_utils.nearest_keyframe(video_path, start_time)
+            if (keyframe is not None
+                    and start_time - keyframe <= self.keyframe_tolerance):
+                copy_cmd = [
+                    "ffmpeg", "-y",
+                    "-ss", str(keyframe),
+                    "-i", video_path,
+                    "-to", str(end_time - keyframe),
+                    "-c", "copy",
+                    "-avoid_negative_ts", "make_zero",
+                    output_path
+                ]
+                process = subprocess.run(copy_cmd, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE, text=True,
+                                         check=False)
+                if process.returncode == 0:
+                    logger.info(f"起点对齐关键帧 {keyframe:.2f}秒，已使用流复制裁剪")
+                    self._record_clip_metadata(output_path)
+                    return True
+                logger.warning(f"流复制裁剪失败，回退到重新编码: {process.stderr[-500:]}")
+
+        # 统一分辨率、帧率、像素格式与关键帧间隔，保证各片段可用concat demuxer流复制拼接
+        params = self.video_params or {}
+        if not video_utils.cut_clip(
+            video_path, start_time, end_time, output_path,
+            width=params.get('width'), height=params.get('height'),
+            fps=params.get('fps'),
+            audio_sample_rate=CLIP_AUDIO_SAMPLE_RATE,
+            audio_channels=CLIP_AUDIO_CHANNELS,
+            use_gpu=self.use_gpu
+        ):
+            return False
+        self._record_clip_metadata(output_path)
+        return True
+
+    def _record_clip_metadata(self, output_path: str) -> None:
+        """
+        探测刚裁剪出的片段并写入元数据缓存（临时条目，不写回磁盘），拼接前无需再次探测
+
+        参数:
+            output_path: 裁剪出的片段路径
+        """
+        info = video_fix_tools.get_video_info(output_path)
+        if info and 'error' not in info:
+            metadata_cache.put(output_path, info, transient=True)
+
+    def _probe_clips(self, clip_paths: List[str]
+                     ) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取各片段的视频信息（裁剪时已写入元数据缓存的片段不再探测）
+
+        参数:
+            clip_paths: 视频片段路径列表
+
+        返回:
+            视频信息列表，任一片段探测失败则返回None
+        """
+        clip_infos = []
+        for path in clip_paths:
+            info = metadata_cache.get_or_fetch(
+                path, video_fix_tools.get_video_info)
+            if not info or 'error' in info or not info.get('video_info'):
+                return None
+            clip_infos.append(info)
+        return clip_infos
+
+    @staticmethod
+    def _clips_share_format(clip_infos: List[Dict[str, Any]]) -> bool:
+        """
+        检查片段的编码、分辨率、帧率以及音频编码、采样率和声道数是否一致（concat demuxer流复制的前提）
+
+        参数:
+            clip_infos: _probe_clips 返回的视频信息列表
+
+        返回:
+            是否全部一致
+        """
+        formats = set()
+        for info in clip_infos:
+            video_info = info['video_info']
+            audio_info = info.get('audio_info') or {}
+            if audio_info.get('codec') and not (
+                    audio_info.get('sample_rate')
+                    and audio_info.get('channels')):
+                # 缺少采样率或声道信息（旧缓存条目）时无法确认可以流复制
+                return False
+            formats.add((
+                video_info.get('codec'),
+                video_info.get('width'),
+                video_info.get('height'),
+                round(video_info.get('fps', 0), 3),
+                audio_info.get('codec'),
+                audio_info.get('sample_rate'),
+                audio_info.get('channels')
+            ))
+        return len(formats) == 1
 
     async def process_demo_video(self, video_path: str, vocabulary_id: str = None) -> Dict[str, Any]:
         """
@@ -56,8 +485,11 @@ class MagicVideoService:
             # 2. 加载字幕数据
             subtitles_json = subtitles_files['json']
             try:
-                with open(subtitles_json, 'r', encoding='utf-8') as f:
-                    subtitles = json.load(f)
+                # 字幕文件由处理器以orjson写出，按字节读取后直接解析，不经过文本解码
+                with open(subtitles_json, 'rb') as f:
+                    data = f.read()
+                    subtitles = (orjson.loads(data) if ORJSON_AVAILABLE
+                                 else json.loads(data))
             except Exception as e:
                 logger.error(f"加载字幕文件失败: {str(e)}")
                 return {"error": f"加载字幕文件失败: {str(e)}"}
@@ -86,8 +518,8 @@ class MagicVideoService:
             # 创建目录
             segments_dir = os.path.join('data', 'processed', 'analysis', 'results')
             reports_dir = os.path.join('data', 'processed', 'analysis', 'reports')
-            os.makedirs(segments_dir, exist_ok=True)
-            os.makedirs(reports_dir, exist_ok=True)
+            video_utils.ensure_dir(segments_dir)
+            video_utils.ensure_dir(reports_dir)
             
             # 保存段落分析结果
             segments_file = os.path.join(segments_dir, f"{video_name_without_ext}.mp4_segments.json")
@@ -154,10 +586,10 @@ class MagicVideoService:
             
             # 输出文件路径
             output_dir = os.path.join('data', 'output', 'videos')
-            os.makedirs(output_dir, exist_ok=True)
+            video_utils.ensure_dir(output_dir)
             
             output_path = os.path.join(output_dir, f"{output_filename}.mp4") if output_filename else os.path.join(output_dir, f"magic_video_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
-            temp_dir = os.path.join('data', 'temp', 'videos', str(uuid.uuid4()))
+            temp_dir = os.path.join(self.temp_root, str(uuid.uuid4()))
             os.makedirs(temp_dir, exist_ok=True)
             
             try:
@@ -192,6 +624,21 @@ class MagicVideoService:
                     demo_duration = None
                     demo_audio = None
                 
+                # 以Demo视频的分辨率和帧率作为片段统一输出参数
+                self.video_params = None
+                demo_info = metadata_cache.get_or_fetch(
+                    demo_video_path, video_fix_tools.get_video_info)
+                if demo_info and 'error' not in demo_info:
+                    demo_video_info = demo_info.get('video_info', {})
+                    width = demo_video_info.get('width')
+                    height = demo_video_info.get('height')
+                    if width and height and demo_video_info.get('fps'):
+                        self.video_params = {
+                            'width': width + width % 2,
+                            'height': height + height % 2,
+                            'fps': demo_video_info['fps']
+                        }
+
                 # 提取示范视频的音频（如果需要）
                 demo_audio_path = None
                 if use_demo_audio and demo_audio is None:
@@ -203,13 +650,27 @@ class MagicVideoService:
                     except Exception as audio_error:
                         logger.warning(f"提取示范视频音频时出错: {str(audio_error)}，将不使用音频")
                 
-                # 1. 提取每个阶段的最佳匹配片段
+                # 1. 提取每个阶段的最佳匹配片段（按阶段顺序处理，结果天然有序，同时收集片段路径）
                 clips_to_concat = []
+                clip_paths = []
                 total_duration = 0
                 
                 # 首先按阶段排序处理匹配结果
                 sorted_stages = sorted(match_results.keys(), key=lambda x: int(x) if x.isdigit() else float('inf'))
                 
+                # 已知Demo时长时，在时长预算内为各阶段选择片段
+                selected_matches = None
+                if demo_duration is not None:
+                    if self.selection_strategy == "round_robin":
+                        select = select_stage_matches_round_robin
+                    else:
+                        select = select_stage_matches
+                    selected_matches = select(
+                        [(stage_id, match_results[stage_id])
+                         for stage_id in sorted_stages],
+                        demo_duration
+                    )
+
                 for stage_id in sorted_stages:
                     matches = match_results[stage_id]
                     if not matches:
@@ -217,7 +678,13 @@ class MagicVideoService:
                         continue
                     
                     # 获取该阶段的最佳匹配
-                    best_match = matches[0]
+                    if selected_matches is not None:
+                        if stage_id not in selected_matches:
+                            logger.warning(f"阶段 {stage_id} 的候选片段均超出剩余时长，跳过")
+                            continue
+                        best_match = selected_matches[stage_id]
+                    else:
+                        best_match = matches[0]
                     video_id = best_match['video_id']
                     start_time = best_match['start_time']
                     end_time = best_match['end_time']
@@ -252,35 +719,24 @@ class MagicVideoService:
                         continue
                     
                     # 查找视频文件的完整路径
-                    # 首先尝试在test_samples目录中查找
-                    video_path = None
-                    search_paths = [
-                        os.path.join('data', 'test_samples', 'input', 'video', video_id),
-                        os.path.join('data', 'input', video_id),
-                        os.path.join('data', 'uploads', 'videos', video_id),
-                        video_id  # 万一传入的就是完整路径
-                    ]
-                    
-                    for path in search_paths:
-                        if os.path.exists(path) and os.path.isfile(path):
-                            video_path = path
-                            logger.info(f"找到视频文件: {video_path}")
-                            break
-                    
+                    video_path = self._find_video_file(video_id)
                     if not video_path:
                         logger.error(f"找不到视频文件: {video_id}")
                         continue
                     
                     # 处理时间范围，确保不超出视频长度
                     try:
-                        # 使用安全的视频加载方法
-                        temp_clip, error = video_fix_tools.safe_get_video_clip(video_path)
-                        if temp_clip is None:
+                        # 通过元数据缓存获取时长，文件未变化时无需再次探测
+                        video_info = metadata_cache.get_or_fetch(
+                            video_path, video_fix_tools.get_video_info)
+                        if (not video_info or 'error' in video_info
+                                or not video_info.get('duration')):
+                            error = (video_info.get('error') if video_info
+                                     else "无法读取视频信息")
                             logger.error(f"无法加载视频 {video_id} (路径: {video_path}): {error}")
                             continue
                         
-                        video_duration = temp_clip.duration
-                        temp_clip.close()
+                        video_duration = video_info['duration']
                         
                         # 如果结束时间超出视频长度，则调整为视频长度
                         if end_time > video_duration:
@@ -296,29 +752,11 @@ class MagicVideoService:
                     
                     try:
                         # 使用FFmpeg精确裁剪
-                        ffmpeg_cmd = [
-                            "ffmpeg", "-y",
-                            "-i", video_path,
-                            "-ss", str(start_time),
-                            "-to", str(end_time),
-                            "-c:v", "libx264", "-c:a", "aac",
-                            "-preset", "fast", "-crf", "22",
-                            temp_clip_path
-                        ]
-                        
-                        process = subprocess.run(
-                            ffmpeg_cmd,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            text=True,
-                            check=False
-                        )
-                        
-                        if process.returncode != 0:
-                            logger.error(f"裁剪视频失败: {process.stderr}")
+                        if not self._extract_clip(video_path, start_time,
+                                                  end_time, temp_clip_path):
                             continue
                             
-                        if not os.path.exists(temp_clip_path) or os.path.getsize(temp_clip_path) == 0:
+                        if not video_utils.is_nonempty_file(temp_clip_path):
                             logger.error(f"裁剪后的视频文件不存在或为空: {temp_clip_path}")
                             continue
                         
@@ -336,6 +774,7 @@ class MagicVideoService:
                             'end_time': end_time,
                             'duration': segment_duration
                         })
+                        clip_paths.append(temp_clip_path)
                         
                         total_duration += segment_duration
                         logger.info(f"当前累计时长: {total_duration:.2f}秒")
@@ -351,52 +790,113 @@ class MagicVideoService:
                 
                 if not clips_to_concat:
                     raise ValueError("没有有效的视频片段可合成")
-                
-                # 按阶段排序
-                clips_to_concat.sort(key=lambda x: int(x['stage']) if isinstance(x['stage'], str) and x['stage'].isdigit() else float('inf'))
-                
-                # 2. 使用MoviePy合成视频
+
+                # 使用Demo音频且参数已知时，用单次FFmpeg调用完成拼接、补齐时长和配音，不再经MoviePy逐帧解码重编码
+                if (use_demo_audio and self.video_params
+                        and demo_duration is not None
+                        and demo_info and demo_info.get('has_audio')):
+                    if video_utils.build_final_video(
+                        clip_paths,
+                        output_path,
+                        width=self.video_params['width'],
+                        height=self.video_params['height'],
+                        fps=self.video_params['fps'],
+                        audio_path=demo_video_path,
+                        target_duration=demo_duration,
+                        use_gpu=self.use_gpu
+                    ):
+                        if demo_audio is not None:
+                            try:
+                                demo_audio.close()
+                            except Exception:
+                                pass
+                        logger.info(f"魔法视频合成完成（单次FFmpeg合成）: {output_path}")
+                        temp_cleanup.schedule_removal(temp_dir)
+                        return output_path
+                    logger.warning("单次FFmpeg合成失败，回退到分步合成")
+
+                # 2. 合成视频：参数一致时流复制拼接，不一致时用filter_complex拼接，失败再回退MoviePy
                 video_clips = []
+                final_clip = None
                 
-                for clip_info in clips_to_concat:
-                    clip_path = clip_info['path']
-                    try:
-                        # 使用安全的方法加载视频片段
-                        video_clip, error = video_fix_tools.safe_get_video_clip(clip_path)
-                        if video_clip is None:
-                            logger.error(f"无法加载视频片段: {clip_path}, 错误: {error}")
-                            continue
+                clip_infos = (self._probe_clips(clip_paths)
+                              if len(clip_paths) > 1 else None)
+                if clip_infos:
+                    concat_path = os.path.join(temp_dir, "concat.mp4")
+                    if self._clips_share_format(clip_infos):
+                        concatenated = video_utils.concat_videos(
+                            clip_paths, concat_path)
+                    elif use_demo_audio or all(info.get('has_audio')
+                                               for info in clip_infos):
+                        # 参数不一致时用单个filter_complex统一尺寸与帧率后拼接，只编码一次
+                        formats = [info['video_info'] for info in clip_infos]
+                        concatenated = video_utils.concat_with_fades(
+                            clip_paths, concat_path,
+                            width=max(f['width'] for f in formats),
+                            height=max(f['height'] for f in formats),
+                            fps=max(f['fps'] for f in formats) or 30,
+                            transition_duration=0,
+                            include_audio=not use_demo_audio,
+                            use_gpu=self.use_gpu
+                        )
+                    else:
+                        concatenated = False
                     
-                        # 如果使用Demo视频的音频，则将片段音量设为0
-                        if use_demo_audio:
-                            video_clip = video_clip.without_audio()
+                    if concatenated:
+                        final_clip, error = (
+                            video_fix_tools.safe_get_video_clip(concat_path))
+                        if final_clip is None:
+                            logger.warning(f"加载拼接结果失败，回退到MoviePy合成: {error}")
+                        else:
+                            if use_demo_audio:
+                                final_clip = final_clip.without_audio()
+                            video_clips.append(final_clip)
+                            logger.info(f"已使用FFmpeg拼接 {len(clip_paths)} 个视频片段")
+
+                if final_clip is None:
+                    for clip_path in clip_paths:
+                        try:
+                            # 使用安全的方法加载视频片段
+                            video_clip, error = (
+                                video_fix_tools.safe_get_video_clip(clip_path))
+                            if video_clip is None:
+                                logger.error(f"无法加载视频片段: {clip_path}, "
+                                             f"错误: {error}")
+                                continue
                     
-                        video_clips.append(video_clip)
-                    except Exception as e:
-                        logger.error(f"加载视频片段出错: {clip_path}, 错误: {str(e)}")
+                            # 如果使用Demo视频的音频，则将片段音量设为0
+                            if use_demo_audio:
+                                video_clip = video_clip.without_audio()
+
+                            video_clips.append(video_clip)
+                        except Exception as e:
+                            logger.error(f"加载视频片段出错: {clip_path}, "
+                                         f"错误: {str(e)}")
                 
-                if not video_clips:
-                    raise ValueError("所有视频片段加载失败")
+                    if not video_clips:
+                        raise ValueError("所有视频片段加载失败")
                 
-                # 合成视频
-                logger.info(f"合成 {len(video_clips)} 个视频片段，总时长预计: {total_duration:.2f}秒")
+                    # 合成视频
+                    logger.info(f"合成 {len(video_clips)} 个视频片段，"
+                                f"总时长预计: {total_duration:.2f}秒")
                 
-                # 确保传递给concatenate_videoclips的所有片段都有效
-                valid_clips = []
-                for i, clip in enumerate(video_clips):
-                    try:
-                        # 再次检查每个片段
-                        _ = clip.duration
-                        _ = clip.fps
-                        _ = clip.get_frame(0)
-                        valid_clips.append(clip)
-                    except Exception as e:
-                        logger.error(f"片段 {i} 无效，将跳过: {str(e)}")
+                    # 确保传递给concatenate_videoclips的所有片段都有效
+                    valid_clips = []
+                    for i, clip in enumerate(video_clips):
+                        try:
+                            # 再次检查每个片段
+                            _ = clip.duration
+                            _ = clip.fps
+                            _ = clip.get_frame(0)
+                            valid_clips.append(clip)
+                        except Exception as e:
+                            logger.error(f"片段 {i} 无效，将跳过: {str(e)}")
                 
-                if not valid_clips:
-                    raise ValueError("没有有效的视频片段可合成")
+                    if not valid_clips:
+                        raise ValueError("没有有效的视频片段可合成")
                 
-                final_clip = concatenate_videoclips(valid_clips, method="compose")
+                    final_clip = concatenate_videoclips(valid_clips,
+                                                        method="compose")
                 logger.info(f"合成视频实际时长: {final_clip.duration:.2f}秒")
                 
                 # 处理音频部分
@@ -491,12 +991,8 @@ class MagicVideoService:
                 
                 logger.info(f"魔法视频合成完成: {output_path}")
                 
-                # 清理临时文件
-                try:
-                    shutil.rmtree(temp_dir)
-                    logger.info(f"已清理临时目录: {temp_dir}")
-                except Exception as e:
-                    logger.warning(f"清理临时目录时出错: {str(e)}")
+                # 清理临时文件（后台删除，不阻塞返回）
+                temp_cleanup.schedule_removal(temp_dir)
                 
                 return output_path
                 
@@ -504,11 +1000,7 @@ class MagicVideoService:
                 logger.exception(f"合成魔法视频时出错: {str(e)}")
                 
                 # 尝试清理临时文件
-                try:
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-                except:
-                    pass
+                temp_cleanup.schedule_removal(temp_dir)
                     
                 return None
                 
@@ -516,10 +1008,7 @@ class MagicVideoService:
             logger.exception(f"合成魔法视频时出错: {str(e)}")
             
             # 尝试清理临时文件
-            try:
-                if os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
-            except:
-                pass
+            if 'temp_dir' in locals():
+                temp_cleanup.schedule_removal(temp_dir)
             
             return None
\ No newline at end of file
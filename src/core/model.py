@@ -7,9 +7,12 @@ os.environ['DISABLE_TELEMETRY'] = '1'
 os.environ['HF_HUB_DISABLE_TELEMETRY'] = '1'
 
 import torch
+import shutil
 import logging
 from typing import List, Dict, Any, Optional
 from sentence_transformers import SentenceTransformer
+from utils.torch_runtime import select_device, prepare_model, get_cached_model
+from utils.embedding_cache import EmbeddingLRU
 import numpy as np
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -17,21 +20,140 @@ from datetime import datetime
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# ONNX Runtime 推理为可选依赖，缺失时使用 SentenceTransformer
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# 单位化文本向量缓存的最大条目数
+EMBEDDING_CACHE_SIZE = 10000
+
+# 缓存向量int8量化的取值上限：每个向量按自身最大分量缩放到[-127, 127]
+EMBEDDING_QUANT_MAX = 127
+
+# 导出并量化后的ONNX模型目录
+ONNX_MODELS_DIR = os.path.join('data', 'models', 'onnx')
+ONNX_COMPLETE_MARKER = '.export_complete'
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtime 上运行的int8动态量化句向量编码器（仅用于CPU推理）
+
+    首次使用时导出并量化模型，之后直接加载量化结果；encode接口与SentenceTransformer一致，
+    使用均值池化（与 paraphrase-multilingual-MiniLM 系列模型的池化方式相同）
+    """
+
+    def __init__(self, model_name: str, models_dir: str = ONNX_MODELS_DIR,
+                 max_length: int = 128):
+        """
+        参数:
+            model_name: 模型名称，未带组织前缀时按 sentence-transformers 模型处理
+            models_dir: 导出模型的保存目录
+            max_length: 分词截断长度
+        """
+        repo_id = (model_name if '/' in model_name
+                   else f"sentence-transformers/{model_name}")
+        export_dir = os.path.join(models_dir, repo_id.replace('/', '__'))
+        quantized_dir = export_dir + '-int8'
+
+        # 完成标记最后写入；目录存在但没有标记说明上次导出中断，清理后重新导出
+        complete_marker = os.path.join(quantized_dir, ONNX_COMPLETE_MARKER)
+        if not os.path.isfile(complete_marker):
+            logger.info(f"导出并量化ONNX模型: {repo_id}")
+            for directory in (export_dir, quantized_dir):
+                shutil.rmtree(directory, ignore_errors=True)
+            ORTModelForFeatureExtraction.from_pretrained(
+                repo_id, export=True).save_pretrained(export_dir)
+            quantizer = ORTQuantizer.from_pretrained(export_dir)
+            quantizer.quantize(
+                save_dir=quantized_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(
+                    is_static=False, per_channel=False)
+            )
+            AutoTokenizer.from_pretrained(repo_id).save_pretrained(
+                quantized_dir)
+            with open(complete_marker, 'w', encoding='utf-8') as f:
+                f.write(datetime.now().isoformat())
+
+        self.tokenizer = AutoTokenizer.from_pretrained(quantized_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            quantized_dir, file_name='model_quantized.onnx')
+        self.max_length = max_length
+
+    def encode(self, texts: List[str], batch_size: int = 32,
+               show_progress_bar: bool = False,
+               convert_to_numpy: bool = True) -> np.ndarray:
+        """
+        将文本编码为句向量
+
+        参数:
+            texts: 文本列表
+            batch_size: 批处理大小
+            show_progress_bar: 兼容SentenceTransformer的参数，不使用
+            convert_to_numpy: 兼容SentenceTransformer的参数，始终返回numpy数组
+
+        返回:
+            每行一个句向量的float32数组
+        """
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(texts[start:start + batch_size],
+                                    padding=True, truncation=True,
+                                    max_length=self.max_length,
+                                    return_tensors='np')
+            hidden = self.model(**inputs).last_hidden_state
+            # 均值池化，忽略padding位置
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            chunks.append((hidden * mask).sum(axis=1)
+                          / np.clip(mask.sum(axis=1), 1e-9, None))
+        return np.concatenate(chunks).astype(np.float32)
+
 class TextEmbeddingModel:
     """文本嵌入模型封装类"""
     
-    def __init__(self, model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2'):
+    def __init__(self,
+                 model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2',
+                 use_onnx: bool = False, quantize_cache: bool = True):
         """
         初始化文本嵌入模型
         
         参数:
             model_name: 模型名称，默认使用多语言模型
+            use_onnx: 仅有CPU时是否优先使用ONNX Runtime int8量化模型
+                （需安装optimum[onnxruntime]）
+            quantize_cache: 是否以int8存储缓存的向量（内存减为1/4，余弦误差约1e-3）
         """
         logger.info(f"初始化文本嵌入模型: {model_name}")
         try:
-            self.model = SentenceTransformer(model_name)
+            device = select_device()
+            self.device = device
+            self.model = None
+            # 模型在进程内共享，重复创建实例不会重新加载权重
+            if use_onnx and ONNX_AVAILABLE and device == 'cpu':
+                try:
+                    self.model = get_cached_model(
+                        ("onnx_encoder", model_name),
+                        lambda: OnnxSentenceEncoder(model_name))
+                    self.device = 'cpu (onnxruntime int8)'
+                except Exception as e:
+                    logger.warning(f"加载ONNX模型失败，改用SentenceTransformer: "
+                                   f"{str(e)}")
+            if self.model is None:
+                self.model = get_cached_model(
+                    ("sentence_transformer", model_name, device),
+                    lambda: prepare_model(
+                        SentenceTransformer(model_name, device=device), device)
+                )
             self.model_name = model_name
-            logger.info(f"模型 {model_name} 加载成功")
+            # 文本 -> 单位化向量（按最近使用淘汰，加锁后可被多个线程共享），维度名、关键词等参照文本在多次比较中只编码一次
+            self._embedding_cache = EmbeddingLRU(EMBEDDING_CACHE_SIZE)
+            self.quantize_cache = quantize_cache
+            logger.info(f"模型 {model_name} 加载成功，设备: {self.device}")
         except Exception as e:
             logger.error(f"加载模型 {model_name} 失败: {str(e)}")
             raise
@@ -53,18 +175,54 @@ class TextEmbeddingModel:
             return np.array([])
         
         try:
-            embeddings = self.model.encode(
-                texts, 
-                batch_size=batch_size,
-                show_progress_bar=show_progress_bar,
-                convert_to_numpy=True
-            )
+            with torch.inference_mode():
+                embeddings = self.model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    show_progress_bar=show_progress_bar,
+                    convert_to_numpy=True
+                )
             logger.debug(f"成功编码 {len(texts)} 个文本段")
             return embeddings
         except Exception as e:
             logger.error(f"文本编码过程出错: {str(e)}")
             raise
     
+    def _encode_normalized(self, texts: List[str]) -> np.ndarray:
+        """
+        获取单位化的文本向量，缓存未命中的文本合并为一次批量编码
+
+        参数:
+            texts: 文本列表
+
+        返回:
+            每行一个单位向量的float32数组，两向量点积即余弦相似度
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        # 命中结果复制到本地字典，其他线程随后淘汰缓存条目不影响本次取值
+        vectors = self._embedding_cache.get_many(unique_texts)
+        missing = [text for text in unique_texts if text not in vectors]
+        if missing:
+            embeddings = self.encode(missing).astype(np.float32)
+            embeddings /= (np.linalg.norm(embeddings, axis=1, keepdims=True)
+                           + 1e-12)
+            if self.quantize_cache:
+                # 只保留方向：按各自最大分量缩放，读取时重新单位化，无需存储缩放系数
+                peak = np.abs(embeddings).max(axis=1, keepdims=True)
+                scale = EMBEDDING_QUANT_MAX / (peak + 1e-12)
+                embeddings = np.rint(embeddings * scale).astype(np.int8)
+            encoded = dict(zip(missing, embeddings))
+            self._embedding_cache.put_many(encoded)
+            vectors.update(encoded)
+
+        result = np.stack([vectors[text] for text in texts])
+
+        if self.quantize_cache:
+            # 反量化后重新单位化
+            result = result.astype(np.float32)
+            result /= np.linalg.norm(result, axis=1, keepdims=True) + 1e-12
+        return result
+
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
         计算两段文本的相似度
@@ -76,14 +234,17 @@ class TextEmbeddingModel:
         返回:
             相似度得分 (0-1)
         """
+        # 空文本无语义可比，相同文本必然完全相似，都无需编码
+        if not text1 or not text2:
+            return 0.0
+        if text1 == text2:
+            return 1.0
+
         try:
-            embedding1 = self.encode([text1])[0]
-            embedding2 = self.encode([text2])[0]
-            
-            # 计算余弦相似度
-            similarity = np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
+            embedding1, embedding2 = self._encode_normalized([text1, text2])
             
-            return float(similarity)
+            # 单位向量的点积即余弦相似度
+            return float(embedding1 @ embedding2)
         except Exception as e:
             logger.error(f"计算文本相似度出错: {str(e)}")
             return 0.0
@@ -101,22 +262,42 @@ class TextEmbeddingModel:
         """
         if not texts:
             return []
+        if not query:
+            return [0.0] * len(texts)
         
         try:
-            query_embedding = self.encode([query])[0]
-            texts_embeddings = self.encode(texts)
-            
-            # 计算余弦相似度
-            similarities = []
-            for text_embedding in texts_embeddings:
-                similarity = np.dot(query_embedding, text_embedding) / (np.linalg.norm(query_embedding) * np.linalg.norm(text_embedding))
-                similarities.append(float(similarity))
+            query_embedding = self._encode_normalized([query])[0]
+            texts_embeddings = self._encode_normalized(texts)
             
-            return similarities
+            # 单位向量的点积即余弦相似度，一次矩阵乘法完成
+            return (texts_embeddings @ query_embedding).tolist()
         except Exception as e:
             logger.error(f"批量计算文本相似度出错: {str(e)}")
             return [0.0] * len(texts)
     
+    def calculate_similarity_matrix(self, texts1: List[str],
+                                    texts2: List[str]) -> np.ndarray:
+        """
+        计算两组文本两两之间的相似度
+
+        参数:
+            texts1: 第一组文本
+            texts2: 第二组文本
+
+        返回:
+            形状为 (len(texts1), len(texts2)) 的相似度矩阵，出错时全为0
+        """
+        if not texts1 or not texts2:
+            return np.zeros((len(texts1), len(texts2)), dtype=np.float32)
+
+        try:
+            # 每个文本只编码一次，所有组合的余弦相似度由一次矩阵乘法得到
+            return (self._encode_normalized(texts1)
+                    @ self._encode_normalized(texts2).T)
+        except Exception as e:
+            logger.error(f"计算相似度矩阵出错: {str(e)}")
+            return np.zeros((len(texts1), len(texts2)), dtype=np.float32)
+
     def match_dimensions(self, text: str, dimensions: Dict[str, Any], threshold: float = 0.7) -> Dict[str, Dict[str, float]]:
         """
         匹配文本与维度
@@ -230,15 +411,16 @@ class VideoAnalysisModel:
             return segments
         
         try:
+            text_segments = [segment for segment in segments
+                             if segment.get('text', '')]
+
+            # 所有片段与关键词的相似度一次算出
+            similarity_matrix = self.text_model.calculate_similarity_matrix(
+                [segment['text'] for segment in text_segments], keywords
+            )
+
             results = []
-            for segment in segments:
-                text = segment.get('text', '')
-                if not text:
-                    continue
-                
-                # 计算与关键词的相似度
-                similarities = self.text_model.calculate_similarities(text, keywords)
-                
+            for segment, similarities in zip(text_segments, similarity_matrix):
                 # 筛选高于阈值的关键词
                 keyword_matches = {}
                 for keyword, score in zip(keywords, similarities):
@@ -40,6 +40,18 @@ class AdAnalysisStrategy(ABC):
             关键词列表
         """
         pass
+
+    def extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        """
+        批量提取广告文本关键词，默认逐段调用extract_keywords，需要远程请求的策略可覆盖为并发实现
+
+        参数:
+            texts: 广告文本列表
+
+        返回:
+            与texts一一对应的关键词列表
+        """
+        return [self.extract_keywords(text) for text in texts]
         
     @abstractmethod
     def name(self) -> str:
@@ -160,6 +172,19 @@ class LLMAnalysisStrategy(AdAnalysisStrategy):
             logger.exception(f"LLM提取关键词时出错: {str(e)}")
             return self._fallback_extract_keywords(text)
     
+    def extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        """使用LLM并发提取多段文本的关键词，失败或为空的段落使用备用方法"""
+        if not self.is_available:
+            return [self._fallback_extract_keywords(text) for text in texts]
+
+        try:
+            results = self.llm_service.extract_brand_keywords_batch_sync(texts)
+        except Exception as e:
+            logger.exception(f"LLM批量提取关键词时出错: {str(e)}")
+            results = [None] * len(texts)
+        return [result or self._fallback_extract_keywords(text)
+                for text, result in zip(texts, results)]
+
     def _fallback_extract_keywords(self, text: str) -> List[str]:
         """关键词提取备用方法"""
         # 使用简单的规则提取一些关键词
@@ -221,7 +246,18 @@ class HybridAnalysisStrategy(AdAnalysisStrategy):
         """使用混合策略提取关键词"""
         bert_keywords = self.bert_strategy.extract_keywords(text)
         llm_keywords = self.llm_strategy.extract_keywords(text)
-        
+        return self._combine_keywords(bert_keywords, llm_keywords)
+
+    def extract_keywords_batch(self, texts: List[str]) -> List[List[str]]:
+        """使用混合策略批量提取关键词，LLM部分并发请求"""
+        bert_batch = self.bert_strategy.extract_keywords_batch(texts)
+        llm_batch = self.llm_strategy.extract_keywords_batch(texts)
+        return [self._combine_keywords(bert_keywords, llm_keywords)
+                for bert_keywords, llm_keywords in zip(bert_batch, llm_batch)]
+
+    def _combine_keywords(self, bert_keywords: List[str],
+                          llm_keywords: List[str]) -> List[str]:
+        """合并BERT与LLM关键词，主要策略在前，最多5个"""
         # 合并两种方法的结果，确保不重复
         combined_keywords = []
         
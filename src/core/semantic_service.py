@@ -6,7 +6,9 @@
 """
 
 import os
+import re
 import json
+import heapq
 import logging
 from typing import List, Dict, Any, Tuple
 import numpy as np
@@ -17,6 +19,9 @@ from src.core.semantic_analysis_strategy import AdAnalysisStrategyFactory
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 关键词提取前需要去除的中文标点
+_PUNCTUATION_RE = re.compile(r'[，。！？]')
+
 class SemanticAnalysisService:
     """语义分析服务，提供字幕分段、关键词提取和标题生成等功能"""
     
@@ -66,8 +71,12 @@ class SemanticAnalysisService:
             logger.info("使用BERT模型进行广告视频分段")
             segments = self.bert_service.segment_ad_video(subtitles)
             
+            # 关键词只依赖段落文本，整批提取（LLM策略并发请求，不再逐段串行等待）
+            keywords_batch = self.analysis_strategy.extract_keywords_batch(
+                [segment["text"] for segment in segments])
+
             # 使用选择的分析策略进行内容分析
-            for segment in segments:
+            for segment, keywords in zip(segments, keywords_batch):
                 # 使用策略分析广告阶段
                 phase = self.analysis_strategy.analyze_ad_phase(segment["text"])
                 if phase != "一般内容":
@@ -79,7 +88,7 @@ class SemanticAnalysisService:
                 segment.update(content_analysis)
                 
                 # 使用策略提取关键词
-                segment["keywords"] = self.analysis_strategy.extract_keywords(segment["text"])
+                segment["keywords"] = keywords
                 segment["title"] = self._generate_title(segment["text"], segment["primary_intent"])
                 
             logger.info(f"分段完成，共{len(segments)}个段落")
@@ -275,22 +284,19 @@ class SemanticAnalysisService:
                     break
                     
         # 如果关键词不足，根据长度自动生成一些
-        words = text.replace("，", "").replace("。", "").replace("！", "").replace("？", "").split()
+        words = _PUNCTUATION_RE.sub("", text).split()
         
-        # 筛选4个字以下的词
-        short_words = [w for w in words if 1 < len(w) <= 4]
+        # 筛选4个字以下的词（去重并保持首次出现顺序，排除已选关键词）
+        selected = set(keywords)
+        short_words = [w for w in dict.fromkeys(words)
+                       if 1 < len(w) <= 4 and w not in selected]
         
         # 提取一些词作为关键词
         if short_words and len(keywords) < limit:
-            # 选择一些较长的词作为关键词
+            # 选择一些较长的词作为关键词：堆选前k个，O(N log k)，不对全部候选排序
+            # （nlargest与稳定排序结果一致，等长词保持原有先后）
             remaining_count = limit - len(keywords)
-            sorted_words = sorted(short_words, key=len, reverse=True)
-            
-            for word in sorted_words:
-                if word not in keywords:
-                    keywords.append(word)
-                    remaining_count -= 1
-                    if remaining_count <= 0:
-                        break
+            keywords.extend(heapq.nlargest(remaining_count, short_words,
+                                           key=len))
                         
         return keywords 
\ No newline at end of file
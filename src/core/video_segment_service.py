@@ -2,6 +2,7 @@ import os
 import json
 import logging
 from typing import Dict, Any, List, Optional, Literal, Tuple
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import asyncio
@@ -194,6 +195,11 @@ class VideoSegmentService:
         bounded_tasks = [bounded_process(intent_id, task) for intent_id, task in tasks]
         results = await asyncio.gather(*bounded_tasks)
         
+        # 意图ID到名称的映射，避免为每个匹配项线性查找意图列表
+        intent_names = {}
+        for intent in intents:
+            intent_names.setdefault(intent.get('id'), intent.get('name'))
+
         # 处理结果
         for intent_id, matches, error in results:
             if error:
@@ -205,12 +211,12 @@ class VideoSegmentService:
                     all_errors.append((intent_id, error_msg))
                 else:
                     # 给匹配结果添加意图信息
+                    intent_name = intent_names.get(intent_id)
                     for match in matches:
                         if isinstance(match, dict):
                             match['intent_id'] = intent_id
-                            intent_data = next((i for i in intents if i.get('id') == intent_id), None)
-                            if intent_data:
-                                match['intent_name'] = intent_data.get('name')
+                            if intent_id in intent_names:
+                                match['intent_name'] = intent_name
                     
                     # 添加到总结果列表
                     all_matches.extend(matches)
@@ -242,27 +248,37 @@ class VideoSegmentService:
         # 过滤得分低于60的结果
         filtered_matches = [m for m in matches if isinstance(m, dict) and m.get('score', 0) >= 60]
         
-        # 按意图分组
-        grouped_results = {}
-        for match in filtered_matches:
-            intent_id = match.get('intent_id')
-            if not intent_id:
-                continue
-                
-            if intent_id not in grouped_results:
-                grouped_results[intent_id] = {
-                    "intent_id": intent_id,
-                    "intent_name": match.get('intent_name', '未知意图'),
-                    "matches": []
-                }
-                
-            # 移除意图信息，避免重复
-            match_data = {k: v for k, v in match.items() if k not in ['intent_id', 'intent_name']}
-            grouped_results[intent_id]["matches"].append(match_data)
+        # 丢弃没有意图ID的结果
+        valid_matches = [m for m in filtered_matches if m.get('intent_id')]
+        if not valid_matches:
+            return {}
+
+        # 用numpy一次完成分组：按意图编码排序，组内按分数降序（稳定排序保持原有先后）
+        intent_ids = np.array([m['intent_id'] for m in valid_matches],
+                              dtype=object)
+        scores = np.array([m.get('score', 0) for m in valid_matches],
+                          dtype=float)
+        unique_ids, first_index, inverse = np.unique(
+            intent_ids, return_index=True, return_inverse=True)
+        order = np.lexsort((-scores, inverse))
+        bounds = np.searchsorted(inverse[order],
+                                 np.arange(len(unique_ids) + 1))
         
-        # 对每个意图的匹配结果按分数排序
-        for intent_id in grouped_results:
-            grouped_results[intent_id]["matches"].sort(key=lambda x: x.get('score', 0), reverse=True)
+        # 按意图首次出现的顺序输出分组
+        grouped_results = {}
+        for group in np.argsort(first_index):
+            first_match = valid_matches[first_index[group]]
+            intent_id = first_match['intent_id']
+            grouped_results[intent_id] = {
+                "intent_id": intent_id,
+                "intent_name": first_match.get('intent_name', '未知意图'),
+                # 移除意图信息，避免重复
+                "matches": [
+                    {k: v for k, v in valid_matches[i].items()
+                     if k not in ['intent_id', 'intent_name']}
+                    for i in order[bounds[group]:bounds[group + 1]]
+                ]
+            }
         
         return grouped_results
     
@@ -80,15 +80,18 @@ def import_from_csv(upload_file, list_name, append_mode, has_existing_data):
     try:
         df_import = pd.read_csv(upload_file)
         if 'text' in df_import.columns:
-            imported = []
-            for _, row in df_import.iterrows():
-                text = row.get('text', '')
-                if text and len(text) <= 10:
-                    imported.append({
-                        'text': text,
-                        'weight': int(row.get('weight', 4)),
-                        'lang': row.get('lang', 'zh')
-                    })
+            # 按列整体处理，避免逐行iterrows构造Series
+            texts = df_import['text']
+            valid = texts.map(
+                lambda text: isinstance(text, str) and 0 < len(text) <= 10)
+            columns = df_import.columns
+            weights = (df_import['weight'].fillna(4).astype(int)
+                       if 'weight' in columns else 4)
+            langs = (df_import['lang'].fillna('zh')
+                     if 'lang' in columns else 'zh')
+            df_valid = pd.DataFrame(
+                {'text': texts, 'weight': weights, 'lang': langs})[valid]
+            imported = df_valid.to_dict('records')
             
             # 如果选择了追加模式且有现有数据
             if append_mode and has_existing_data:
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+测试魔法视频片段选择
+
+验证在Demo时长预算内为各阶段选择总相似度最高的片段组合
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.core.magic_video_service import (select_stage_matches,
+                                          select_stage_matches_round_robin)
+
+
+def _match(duration, similarity):
+    return {"video_id": "demo.mp4", "start_time": 0.0, "end_time": duration,
+            "similarity": similarity}
+
+
+def test_select_stage_matches_respects_duration_budget():
+    """总时长不超过预算，且总相似度最高"""
+    stage_matches = [
+        ("1", [_match(10, 90), _match(4, 80)]),
+        ("2", [_match(8, 95), _match(3, 60)]),
+        ("3", [_match(30, 99)]),
+    ]
+
+    selected = select_stage_matches(stage_matches, target_duration=12)
+
+    assert set(selected) == {"1", "2"}
+    assert selected["1"]["end_time"] == 4
+    assert selected["2"]["end_time"] == 8
+
+
+def test_select_stage_matches_picks_best_when_budget_allows():
+    """预算充足时每个阶段都选相似度最高的片段"""
+    stage_matches = [
+        ("1", [_match(10, 90), _match(4, 80)]),
+        ("2", [_match(8, 95), _match(3, 60)]),
+    ]
+
+    selected = select_stage_matches(stage_matches, target_duration=100)
+
+    assert selected["1"]["similarity"] == 90
+    assert selected["2"]["similarity"] == 95
+    assert select_stage_matches(stage_matches, target_duration=0) == {}
+
+
+def test_select_stage_matches_round_robin_prefers_unit_score():
+    """轮转选择优先单位时长得分高的片段，且不超过预算"""
+    stage_matches = [
+        ("1", [_match(10, 90), _match(4, 80)]),
+        ("2", [_match(8, 95), _match(3, 60)]),
+        ("3", [_match(30, 99)]),
+    ]
+
+    selected = select_stage_matches_round_robin(stage_matches,
+                                                target_duration=12)
+
+    assert set(selected) == {"1", "2"}
+    assert selected["1"]["end_time"] == 4
+    total = sum(m["end_time"] - m["start_time"] for m in selected.values())
+    assert total <= 12
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+测试模型缓存
+
+验证并发的首次请求只加载一次模型，以及按类型清理缓存
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.torch_runtime import get_cached_model, purge_model_cache
+
+
+def test_concurrent_first_load_runs_loader_once():
+    """并发获取同一模型时只调用一次加载函数"""
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            get_cached_model(("test_model", "a"), loader)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert purge_model_cache("test_model") == 1
+
+
+def test_failed_load_is_not_cached():
+    """加载失败时不缓存，下次调用重新加载"""
+    def failing_loader():
+        raise RuntimeError("加载失败")
+
+    try:
+        get_cached_model(("test_model", "b"), failing_loader)
+        assert False, "应抛出加载异常"
+    except RuntimeError:
+        pass
+
+    model = get_cached_model(("test_model", "b"), lambda: "loaded")
+    assert model == "loaded"
+    assert purge_model_cache("test_model") == 1
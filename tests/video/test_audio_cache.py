@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+字幕缓存持久化测试
+
+验证NDJSON缓存只追加修改过的条目，重新加载时正确回放新增和删除
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.processor import VideoProcessor, AUDIO_CACHE_FILE
+
+
+def test_audio_cache_appends_and_compacts(tmp_path, monkeypatch):
+    """新增条目以追加行的方式写入，删除后行数过多时整体重写，新实例加载后内容一致"""
+    monkeypatch.chdir(tmp_path)
+    processor = VideoProcessor()
+    processor._update_audio_cache("a", [{"text": "你好"}])
+    processor.flush_audio_cache()
+    processor._update_audio_cache("b", [{"text": "世界"}])
+    processor.flush_audio_cache()
+    cache_text = Path(AUDIO_CACHE_FILE).read_text(encoding="utf-8")
+    assert len(cache_text.splitlines()) == 2
+
+    processor._update_audio_cache("a", None)
+    processor.flush_audio_cache()
+    cache_text = Path(AUDIO_CACHE_FILE).read_text(encoding="utf-8")
+    assert len(cache_text.splitlines()) == 1
+
+    reloaded = VideoProcessor()
+    assert reloaded.audio_cache == {"b": [{"text": "世界"}]}
+
+
+def test_extraction_flushes_cache_before_returning(tmp_path, monkeypatch):
+    """写盘间隔内连续提取字幕，每次提取结束时缓存已落盘，不依赖进程退出"""
+    monkeypatch.chdir(tmp_path)
+    processor = VideoProcessor()
+    monkeypatch.setattr(processor, "_upload_to_accessible_url",
+                        lambda audio_file: "https://example.com/a.wav")
+    sentences = [{"text": "你好", "begin_time": 0, "end_time": 1000}]
+    monkeypatch.setattr("utils.processor.dashscope_sdk.transcribe_audio",
+                        lambda **kwargs: {"status": "success",
+                                          "sentences": sentences})
+    for name in ("a.wav", "b.wav"):
+        Path(name).write_bytes(b"RIFF")
+        assert processor._extract_subtitles_from_video(name)
+
+    del processor
+    assert set(VideoProcessor().audio_cache) == {"a.wav_4", "b.wav_4"}
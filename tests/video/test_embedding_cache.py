@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+文本向量磁盘缓存测试
+
+验证已编码的文本不再重复编码、重新打开缓存后结果可复用
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.embedding_cache import EmbeddingStore
+
+
+def test_get_or_encode_only_encodes_new_texts(tmp_path):
+    """只编码缓存中没有的文本，重新打开后命中磁盘缓存"""
+    calls = []
+
+    def fake_encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(text)), 1.0, 0.5] for text in texts])
+
+    store = EmbeddingStore("sentence-transformers/test-model", str(tmp_path))
+    first = store.get_or_encode(["宝宝", "奶粉配方"], fake_encode)
+    second = store.get_or_encode(["奶粉配方", "新客专享零元"], fake_encode)
+
+    assert calls == [["宝宝", "奶粉配方"], ["新客专享零元"]]
+    assert first.dtype == np.float32
+    np.testing.assert_array_equal(first[1], second[0])
+
+    reopened = EmbeddingStore("sentence-transformers/test-model",
+                              str(tmp_path))
+    third = reopened.get_or_encode(["新客专享零元", "宝宝"], fake_encode)
+    assert len(calls) == 2
+    np.testing.assert_array_equal(third, np.stack([second[1], first[0]]))
+
+
+def test_variants_stored_separately(tmp_path):
+    """同名模型的不同精度/后端不共享向量"""
+    calls = []
+
+    def fake_encode(texts):
+        calls.append(list(texts))
+        return np.ones((len(texts), 3))
+
+    for variant in ("float32", "float16"):
+        store = EmbeddingStore("test-model", str(tmp_path), variant=variant)
+        store.get_or_encode(["宝宝"], fake_encode)
+    assert calls == [["宝宝"], ["宝宝"]]
+
+
+def test_rebuilds_when_vector_file_deleted_at_runtime(tmp_path):
+    """运行期间向量文件被删除后重新编码，而不是一直读取失败"""
+    def fake_encode(texts):
+        return np.array([[float(len(text)), 1.0, 0.5] for text in texts])
+
+    store = EmbeddingStore("test-model", str(tmp_path))
+    store.get_or_encode(["宝宝", "奶粉配方"], fake_encode)
+    Path(store.data_path).unlink()
+    texts = ["新客专享零元", "宝宝"]
+    np.testing.assert_array_equal(store.get_or_encode(texts, fake_encode),
+                                  fake_encode(texts))
+
+
+def test_memory_lru_shared_across_threads():
+    """多个线程共享一个小容量缓存，持续淘汰时编码结果仍然正确"""
+    import threading
+    from src.core.model import TextEmbeddingModel
+    from utils.embedding_cache import EmbeddingLRU
+
+    class FakeEncoder:
+        def encode(self, texts, **kwargs):
+            return np.array([[float(len(text)), 1.0] for text in texts])
+
+    model = TextEmbeddingModel.__new__(TextEmbeddingModel)
+    model.model = FakeEncoder()
+    model.quantize_cache = False
+    model._embedding_cache = EmbeddingLRU(4)
+    texts = [f"字幕{i}" * (i % 5 + 1) for i in range(40)]
+    expected = model._encode_normalized(texts)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(200):
+                indices = [(offset + i + j) % len(texts) for j in range(6)]
+                batch = [texts[k] for k in indices]
+                np.testing.assert_allclose(model._encode_normalized(batch),
+                                           expected[indices], rtol=1e-6)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(model._embedding_cache) <= 4
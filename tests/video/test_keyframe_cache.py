@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+关键帧缓存测试
+
+验证同一文件只探测一次、同一路径的文件被覆盖后重新探测
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils import video_utils
+
+
+class _ProbeResult:
+    returncode = 0
+    stdout = "0.000000,\n2.000000\n"
+    stderr = ""
+
+
+def test_keyframes_reprobed_after_file_overwritten(tmp_path, monkeypatch):
+    """文件不变时复用缓存，原路径覆盖写入后重新探测"""
+    calls = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return _ProbeResult()
+
+    monkeypatch.setattr(video_utils.subprocess, "run", fake_run)
+    monkeypatch.setattr(video_utils, "_KEYFRAME_CACHE",
+                        video_utils.OrderedDict())
+
+    video_file = tmp_path / "clip.mp4"
+    video_file.write_bytes(b"fake")
+    assert video_utils.get_keyframe_times(str(video_file)) == [0.0, 2.0]
+    assert video_utils.get_keyframe_times(str(video_file)) == [0.0, 2.0]
+    assert len(calls) == 1
+
+    video_file.write_bytes(b"repaired")
+    video_utils.get_keyframe_times(str(video_file))
+    assert len(calls) == 2
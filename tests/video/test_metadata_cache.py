@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+视频元数据缓存测试
+
+验证文件未变化时复用缓存、文件变化后重新探测
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils import metadata_cache
+
+
+def test_get_or_fetch_reuses_cache_until_file_changes(tmp_path, monkeypatch):
+    """文件不变时只探测一次，修改后重新探测"""
+    monkeypatch.setattr(metadata_cache, "CACHE_FILE",
+                        str(tmp_path / "metadata_cache.json"))
+    monkeypatch.setattr(metadata_cache, "_cache", None)
+
+    video_file = tmp_path / "clip.mp4"
+    video_file.write_bytes(b"fake")
+    path = str(video_file)
+
+    calls = []
+
+    def fake_probe(path):
+        calls.append(path)
+        return {"duration": float(len(calls))}
+
+    assert metadata_cache.get_or_fetch(path, fake_probe) == {"duration": 1.0}
+    assert metadata_cache.get_or_fetch(path, fake_probe) == {"duration": 1.0}
+    assert len(calls) == 1
+
+    # 修改文件内容和修改时间后应重新探测
+    video_file.write_bytes(b"changed")
+    future = time.time() + 10
+    os.utime(video_file, (future, future))
+    assert metadata_cache.get_or_fetch(path, fake_probe) == {"duration": 2.0}
+
+    metadata_cache.save_cache()
+    assert os.path.exists(metadata_cache.CACHE_FILE)
+
+
+def test_get_or_fetch_does_not_cache_errors(tmp_path, monkeypatch):
+    """探测失败的结果不应被缓存"""
+    monkeypatch.setattr(metadata_cache, "CACHE_FILE",
+                        str(tmp_path / "metadata_cache.json"))
+    monkeypatch.setattr(metadata_cache, "_cache", None)
+
+    video_file = tmp_path / "broken.mp4"
+    video_file.write_bytes(b"fake")
+
+    calls = []
+
+    def failing_probe(path):
+        calls.append(path)
+        return {"error": "探测失败"}
+
+    metadata_cache.get_or_fetch(str(video_file), failing_probe)
+    metadata_cache.get_or_fetch(str(video_file), failing_probe)
+    assert len(calls) == 2
+    missing = str(tmp_path / "missing.mp4")
+    assert metadata_cache.get_or_fetch(missing, failing_probe) is None
+
+
+def test_scan_directory_walks_subdirectories(tmp_path, monkeypatch):
+    """递归扫描子目录，只处理视频扩展名"""
+    monkeypatch.setattr(metadata_cache, "CACHE_FILE",
+                        str(tmp_path / "metadata_cache.json"))
+    monkeypatch.setattr(metadata_cache, "_cache", None)
+
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "one.mp4").write_bytes(b"1")
+    (tmp_path / "two.MOV").write_bytes(b"2")
+    (tmp_path / "notes.txt").write_text("x")
+
+    results = metadata_cache.scan_directory(str(tmp_path),
+                                            lambda path: {"duration": 1.0})
+    names = sorted(os.path.basename(p) for p in results)
+    assert names == ["one.mp4", "two.MOV"]
+
+
+def test_put_skips_probe_and_is_not_persisted_when_transient(tmp_path,
+                                                             monkeypatch):
+    """直接写入的元数据可被读取，临时条目不写回磁盘"""
+    monkeypatch.setattr(metadata_cache, "CACHE_FILE",
+                        str(tmp_path / "metadata_cache.json"))
+    monkeypatch.setattr(metadata_cache, "_cache", None)
+    monkeypatch.setattr(metadata_cache, "_transient",
+                        metadata_cache.OrderedDict())
+
+    clip_file = tmp_path / "clip.mp4"
+    clip_file.write_bytes(b"fake")
+    metadata_cache.put(str(clip_file), {"duration": 3.0}, transient=True)
+
+    def failing_probe(path):
+        raise AssertionError("不应调用ffprobe")
+
+    metadata = metadata_cache.get_or_fetch(str(clip_file), failing_probe)
+    assert metadata["duration"] == 3.0
+
+    # 临时条目不标记缓存为已修改，保存时不写文件
+    metadata_cache.save_cache()
+    assert not os.path.exists(metadata_cache.CACHE_FILE)
+
+
+def test_transient_entries_are_bounded(tmp_path, monkeypatch):
+    """临时条目超出上限时淘汰最久未用的条目"""
+    monkeypatch.setattr(metadata_cache, "_transient",
+                        metadata_cache.OrderedDict())
+    monkeypatch.setattr(metadata_cache, "TRANSIENT_CACHE_SIZE", 2)
+
+    clips = []
+    for name in ("a.mp4", "b.mp4", "c.mp4"):
+        clip_file = tmp_path / name
+        clip_file.write_bytes(b"fake")
+        metadata_cache.put(str(clip_file), {"duration": 1.0}, transient=True)
+        clips.append(os.path.abspath(str(clip_file)))
+
+    assert list(metadata_cache._transient) == clips[1:]
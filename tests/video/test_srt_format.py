@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+SRT字幕格式化测试
+
+验证时间格式化使用整数毫秒，不受浮点舍入影响
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径中
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.processor import VideoProcessor
+
+
+def test_format_ms_srt():
+    """整数毫秒直接格式化为SRT时间"""
+    assert VideoProcessor._format_ms_srt(0) == "00:00:00,000"
+    assert VideoProcessor._format_ms_srt(3723004) == "01:02:03,004"
+
+
+def test_save_srt_file_rounds_float_seconds(tmp_path):
+    """秒数换算为毫秒时四舍五入，避免0.29秒被截断为289毫秒"""
+    srt_file = tmp_path / "out.srt"
+    subtitles = [
+        {"start": 0.29, "end": 1.999999, "text": "你好"},
+        {"start": 2.0, "end": 3.5, "text": "世界"}
+    ]
+    # 只测试格式化，跳过__init__中的目录创建和缓存加载
+    processor = VideoProcessor.__new__(VideoProcessor)
+    processor._save_srt_file(subtitles, str(srt_file))
+    assert srt_file.read_text(encoding="utf-8") == (
+        "1\n00:00:00,290 --> 00:00:02,000\n你好\n\n"
+        "2\n00:00:02,000 --> 00:00:03,500\n世界\n\n"
+    )
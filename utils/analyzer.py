@@ -1,7 +1,9 @@
 import os
 import logging
+import threading
 import pandas as pd
 import numpy as np
+import torch
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import json
@@ -15,13 +17,63 @@ os.environ['HF_HUB_DISABLE_TELEMETRY'] = '1'
 os.environ['HF_HUB_DISABLE_SYMLINKS_WARNING'] = '1'
 
 from sentence_transformers import SentenceTransformer, util
+
+# 可选：FAISS向量检索，只取每条查询的前k个结果，不生成完整相似度矩阵
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
 import re
 from multiprocessing import Pool, cpu_count
 from src.config.settings import VIDEO_ANALYSIS_DIR
+from utils.torch_runtime import select_device, prepare_model, get_cached_model
+from utils import embedding_cache
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+
+def _top_k_cosine(queries: np.ndarray, corpus: np.ndarray,
+                  k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    为每条查询向量找出余弦相似度最高的k个语料向量
+
+    安装了faiss时用内积索引（IndexFlatIP）检索，只返回前k个结果，内存为O(N*k)；
+    否则用numpy矩阵乘法计算后取前k个
+
+    参数:
+        queries: 查询向量数组，形状 (N, d)
+        corpus: 语料向量数组，形状 (M, d)
+        k: 每条查询返回的结果数（超过M时取M）
+
+    返回:
+        (indices, scores)：形状均为 (N, k)，按相似度从高到低排列
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    corpus = np.ascontiguousarray(corpus, dtype=np.float32)
+    queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True)
+                         + 1e-12)
+    corpus = corpus / (np.linalg.norm(corpus, axis=1, keepdims=True) + 1e-12)
+    k = min(k, len(corpus))
+
+    if FAISS_AVAILABLE:
+        index = faiss.IndexFlatIP(corpus.shape[1])
+        index.add(corpus)
+        scores, indices = index.search(queries, k)
+        return indices, scores
+
+    similarities = queries @ corpus.T
+    if k == 1:
+        indices = similarities.argmax(axis=1)[:, None]
+    else:
+        # 先用argpartition选出前k个，再只对这k个排序
+        indices = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_similarities = np.take_along_axis(similarities, indices, axis=1)
+        order = np.argsort(-top_similarities, axis=1, kind='stable')
+        indices = np.take_along_axis(indices, order, axis=1)
+    return indices, np.take_along_axis(similarities, indices, axis=1)
+
 class VideoAnalyzer:
     """视频分析器，用于分析视频内容并根据维度或关键词进行匹配"""
     
@@ -85,26 +137,31 @@ class VideoAnalyzer:
             logger.warning(f"模型快照目录不存在: {snapshots_dir}")
             return False
             
-        # 查找快照目录中的第一个子目录
-        snapshot_dirs = [d for d in os.listdir(snapshots_dir) if os.path.isdir(os.path.join(snapshots_dir, d))]
-        if not snapshot_dirs:
+        # 查找快照目录中的第一个子目录（scandir的DirEntry自带类型信息，无需逐项stat）
+        with os.scandir(snapshots_dir) as entries:
+            snapshot_dir = next(
+                (entry.path for entry in entries if entry.is_dir()), None)
+        if not snapshot_dir:
             logger.warning(f"模型快照子目录不存在")
             return False
             
         # 使用第一个快照目录
-        snapshot_dir = os.path.join(snapshots_dir, snapshot_dirs[0])
         logger.info(f"找到模型快照目录: {snapshot_dir}")
         
+        # 一次列出快照目录中的文件名，后续检查都在集合中完成
+        with os.scandir(snapshot_dir) as entries:
+            snapshot_files = {entry.name for entry in entries
+                              if entry.is_file()}
+
         # 检查关键文件是否存在
         required_files = ["modules.json", "config.json"]
         for file in required_files:
-            if not os.path.exists(os.path.join(snapshot_dir, file)):
+            if file not in snapshot_files:
                 logger.warning(f"关键模型文件不存在: {file}")
                 return False
                 
         # 检查是否有model.safetensors或model.bin文件
-        if not (os.path.exists(os.path.join(snapshot_dir, "model.safetensors")) or 
-                os.path.exists(os.path.join(snapshot_dir, "pytorch_model.bin"))):
+        if not ({"model.safetensors", "pytorch_model.bin"} & snapshot_files):
             logger.warning("模型权重文件不存在")
             return False
                 
@@ -143,18 +200,32 @@ class VideoAnalyzer:
                 # 设置离线模式 (已在文件顶部设置)
                 logger.info(f"使用离线模式加载模型: TRANSFORMERS_OFFLINE={os.environ.get('TRANSFORMERS_OFFLINE', '未设置')}")
                 
-                logger.info("开始加载模型...")
-                self.model = SentenceTransformer(self.model_name, cache_folder=cache_dir)
-                logger.info("模型加载成功")
+                device = select_device()
+
+                def load():
+                    logger.info("开始加载模型...")
+                    model = prepare_model(
+                        SentenceTransformer(self.model_name,
+                                            cache_folder=cache_dir,
+                                            device=device),
+                        device
+                    )
+                    logger.info(f"模型加载成功，设备: {device}")
+
+                    # 测试模型是否工作正常
+                    logger.info("测试模型...")
+                    test_sentences = ["测试句子1", "测试句子2"]
+                    try:
+                        embeddings = model.encode(test_sentences)
+                        logger.info(f"模型测试成功，生成了embeddings，"
+                                    f"shape: {embeddings.shape}")
+                    except Exception as test_err:
+                        logger.error(f"模型测试失败: {str(test_err)}")
+                    return model
                 
-                # 测试模型是否工作正常
-                logger.info("测试模型...")
-                test_sentences = ["测试句子1", "测试句子2"]
-                try:
-                    embeddings = self.model.encode(test_sentences)
-                    logger.info(f"模型测试成功，生成了embeddings，shape: {embeddings.shape}")
-                except Exception as test_err:
-                    logger.error(f"模型测试失败: {str(test_err)}")
+                # 进程内共享，多个分析器实例和并发的首次请求只加载一次
+                self.model = get_cached_model(
+                    ("sentence_transformer", self.model_name, device), load)
                 
             except Exception as e:
                 logger.error(f"加载模型失败: {str(e)}")
@@ -212,42 +283,56 @@ class VideoAnalyzer:
                 # 对文本进行分词预处理（仅对中文）
                 preprocessed_texts = [self._preprocess_text(text) for text in texts]
                 
-                # 编码所有文本
-                logger.info(f"编码 {len(texts)} 条文本")
-                text_embeddings = model.encode(preprocessed_texts, show_progress_bar=False)
-                
-                # 编码所有一级维度
-                logger.info(f"编码 {len(level1_dims)} 个一级维度")
-                dim1_embeddings = model.encode([self._preprocess_text(dim) for dim in level1_dims], show_progress_bar=False)
-                
-                # 构建二级维度的编码映射
-                dim2_embeddings = {}
+                # 文本、一级维度和各二级维度合并为一次编码
+                groups = [preprocessed_texts,
+                          [self._preprocess_text(dim) for dim in level1_dims]]
+                dim2_parents = []
                 for dim1 in level1_dims:
                     level2_dims = dimensions.get('level2', {}).get(dim1, [])
                     if level2_dims:
-                        dim2_embeddings[dim1] = model.encode(
-                            [self._preprocess_text(dim2) for dim2 in level2_dims], 
-                            show_progress_bar=False
-                        )
+                        dim2_parents.append(dim1)
+                        groups.append([self._preprocess_text(dim2)
+                                       for dim2 in level2_dims])
+
+                logger.info(f"编码 {len(texts)} 条文本和 {len(level1_dims)} 个一级维度")
+                (text_embeddings, dim1_embeddings,
+                 *level2_embeddings) = self._encode_groups(model, groups)
+
+                # 构建二级维度的编码映射
+                dim2_embeddings = dict(zip(dim2_parents, level2_embeddings))
             except Exception as e:
                 logger.error(f"编码文本时出错: {str(e)}")
                 results["error"] = f"编码文本时出错: {str(e)}"
                 results["analysis_method"] = "未执行分析"
                 return results
             
+            if not level1_dims or not texts:
+                logger.info("维度分析完成，没有可匹配的文本或一级维度")
+                results["analysis_method"] = "语义相似度匹配"
+                return results
+
+            # 一次矩阵运算得到全部文本与各维度的相似度，避免逐对调用cos_sim
+            dim1_similarities = util.cos_sim(
+                text_embeddings, dim1_embeddings).cpu().numpy()
+
+            # 每个一级维度下，预先求出每条文本最相似的二级维度及其相似度（只检索top-1）
+            dim2_best = {}
+            for dim1, level2_embeddings in dim2_embeddings.items():
+                best_idx, best_similarities = _top_k_cosine(
+                    text_embeddings, level2_embeddings, 1)
+                dim2_best[dim1] = (best_idx[:, 0], best_similarities[:, 0])
+
             # 处理每条文本记录
             for i, row in video_data.iterrows():
                 text = row.get('text', '')
                 if not text:
                     continue
                 
-                # 获取当前文本的embedding
-                text_embedding = text_embeddings[i]
+                # 当前文本与各一级维度的相似度
+                text_similarities = dim1_similarities[i]
                 
-                # 计算与一级维度的相似度
                 for dim1_idx, dim1 in enumerate(level1_dims):
-                    # 计算相似度
-                    similarity = util.cos_sim(text_embedding, dim1_embeddings[dim1_idx])[0][0].item()
+                    similarity = float(text_similarities[dim1_idx])
                     
                     # 如果相似度高于阈值，添加到匹配结果
                     if similarity >= threshold:
@@ -255,21 +340,16 @@ class VideoAnalyzer:
                         matched_dim2 = ""
                         max_dim2_similarity = 0
                         
-                        # 如果有二级维度，计算相似度
-                        if dim1 in dim2_embeddings:
-                            level2_dims = dimensions.get('level2', {}).get(dim1, [])
-                            level2_embeddings = dim2_embeddings[dim1]
-                            
-                            # 计算与所有二级维度的相似度
-                            dim2_similarities = util.cos_sim(text_embedding, level2_embeddings)[0]
-                            
-                            # 获取最大相似度的索引
-                            max_dim2_idx = dim2_similarities.argmax().item()
-                            max_dim2_similarity = dim2_similarities[max_dim2_idx].item()
+                        # 如果有二级维度，取预先算好的最大相似度
+                        if dim1 in dim2_best:
+                            best_idx, best_similarities = dim2_best[dim1]
+                            max_dim2_similarity = float(best_similarities[i])
                             
                             # 如果二级维度相似度也高于阈值，记录匹配结果
                             if max_dim2_similarity >= threshold:
-                                matched_dim2 = level2_dims[max_dim2_idx]
+                                level2_dims = dimensions.get(
+                                    'level2', {}).get(dim1, [])
+                                matched_dim2 = level2_dims[best_idx[i]]
                         
                         # 使用最高的相似度作为分数
                         score = max(similarity, max_dim2_similarity)
@@ -339,13 +419,11 @@ class VideoAnalyzer:
                 preprocessed_texts = [self._preprocess_text(text) for text in texts]
                 preprocessed_keywords = [self._preprocess_text(kw) for kw in keywords]
                 
-                # 编码所有文本
-                logger.info(f"编码 {len(texts)} 条文本")
-                text_embeddings = model.encode(preprocessed_texts, show_progress_bar=False)
-                
-                # 编码所有关键词
-                logger.info(f"编码 {len(keywords)} 个关键词")
-                keyword_embeddings = model.encode(preprocessed_keywords, show_progress_bar=False)
+                # 文本和关键词合并为一次编码
+                logger.info(f"编码 {len(texts)} 条文本和 {len(keywords)} 个关键词")
+                text_embeddings, keyword_embeddings = self._encode_groups(
+                    model, [preprocessed_texts, preprocessed_keywords]
+                )
                 
             except Exception as e:
                 logger.error(f"编码文本时出错: {str(e)}")
@@ -353,22 +431,32 @@ class VideoAnalyzer:
                 results["analysis_method"] = "未执行分析"
                 return results
             
+            if not keywords or not texts:
+                logger.info("关键词分析完成，没有可匹配的文本或关键词")
+                results["analysis_method"] = "语义相似度匹配"
+                return results
+
+            # 一次矩阵运算得到全部文本与关键词的相似度；关键词小写形式只计算一次
+            keyword_similarities = util.cos_sim(
+                text_embeddings, keyword_embeddings).cpu().numpy()
+            lowered_keywords = [keyword.lower() for keyword in keywords]
+
             # 处理每条文本记录
             for i, row in video_data.iterrows():
                 text = row.get('text', '')
                 if not text:
                     continue
                 
-                # 获取当前文本的embedding
-                text_embedding = text_embeddings[i]
+                text_similarities = keyword_similarities[i]
+                lowered_text = text.lower()
                 
                 # 计算与预定义关键词的相似度
                 for kw_idx, keyword in enumerate(keywords):
-                    # 计算相似度
-                    similarity = util.cos_sim(text_embedding, keyword_embeddings[kw_idx])[0][0].item()
+                    similarity = float(text_similarities[kw_idx])
                     
                     # 如果相似度高于阈值或关键词直接包含在文本中，添加到匹配结果
-                    if similarity >= threshold or keyword.lower() in text.lower():
+                    if (similarity >= threshold
+                            or lowered_keywords[kw_idx] in lowered_text):
                         results["matches"].append({
                             "keyword": keyword,
                             "timestamp": row.get('timestamp', '00:00:00'),
@@ -393,6 +481,62 @@ class VideoAnalyzer:
             }
             return results
     
+    @staticmethod
+    def _embedding_variant(model) -> str:
+        """
+        获取模型权重精度（CUDA上为半精度），用于区分向量缓存
+
+        参数:
+            model: SentenceTransformer模型
+
+        返回:
+            精度名称，如 float16、float32
+        """
+        try:
+            return str(next(model.parameters()).dtype).replace('torch.', '')
+        except (AttributeError, StopIteration):
+            return 'float32'
+
+    def _encode_groups(self, model,
+                       groups: List[List[str]]) -> List[np.ndarray]:
+        """
+        将多组文本去重后合并为一次编码，再按组拆分结果
+
+        模型内部会按长度排序分批，合并后各批次长度更接近，补齐（padding）更少，
+        也省去多次小批量调用的开销
+
+        参数:
+            model: SentenceTransformer模型
+            groups: 文本分组列表
+
+        返回:
+            与groups一一对应的向量数组列表
+        """
+        unique_texts = list(dict.fromkeys(
+            text for group in groups for text in group))
+        if not unique_texts:
+            return [np.empty((0, 0), dtype=np.float32) for _ in groups]
+
+        def encode(texts):
+            with torch.inference_mode():
+                return model.encode(texts, show_progress_bar=False)
+
+        # 已编码过的文本从磁盘向量缓存读取，只编码新文本；缓存不可用时直接编码
+        embeddings = None
+        if self.config.get('persist_embeddings', True):
+            try:
+                store = embedding_cache.get_store(
+                    self.model_name, self._embedding_variant(model))
+                embeddings = store.get_or_encode(unique_texts, encode)
+            except Exception as e:
+                logger.warning(f"读取向量缓存失败，直接编码: {str(e)}")
+        if embeddings is None:
+            # 半精度模型输出float16，统一转为float32再计算相似度
+            embeddings = np.asarray(encode(unique_texts), dtype=np.float32)
+        positions = {text: idx for idx, text in enumerate(unique_texts)}
+        return [embeddings[[positions[text] for text in group]]
+                for group in groups]
+
     def _preprocess_text(self, text: str) -> str:
         """
         对文本进行预处理，如分词、去除停用词等
@@ -446,4 +590,29 @@ class VideoAnalyzer:
             
         except Exception as e:
             logger.error(f"保存分析结果失败: {str(e)}")
-            return "" 
\ No newline at end of file
+            return ""
+
+
+# 后台预热只在进程内启动一次（Streamlit每次重跑脚本都会调用start_warmup）
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+
+def warmup() -> bool:
+    """
+    预先加载语义匹配模型，使首个分析请求不再承担模型加载耗时
+
+    返回:
+        模型是否加载成功
+    """
+    return VideoAnalyzer()._load_model() is not None
+
+
+def start_warmup() -> None:
+    """在后台线程中预热语义匹配模型，重复调用不会重复启动"""
+    global _warmup_started
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+    threading.Thread(target=warmup, name="model-warmup", daemon=True).start()
@@ -4,8 +4,84 @@ import logging
 import re
 from typing import Dict, Tuple, Optional, Any
 
+from dotenv import dotenv_values
+
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# 超过该大小的配置文件改为流式解析，只构建需要的部分
+STREAMING_CONFIG_THRESHOLD = 1 << 20
+
+_MISSING = object()
+
+# .env解析缓存，键为(路径, 修改时间)
+_env_cache: Dict[Tuple[str, int], Dict[str, str]] = {}
+
+
+def _read_config_section(config_path: str, section: str) -> Any:
+    """
+    读取JSON配置文件中的顶层配置段
+
+    Args:
+        config_path: 配置文件路径
+        section: 顶层键名
+
+    Returns:
+        配置段内容，不存在时返回_MISSING
+    """
+    if (IJSON_AVAILABLE
+            and os.path.getsize(config_path) > STREAMING_CONFIG_THRESHOLD):
+        with open(config_path, 'rb') as f:
+            # 找到目标配置段后立即停止，不解析文件其余部分
+            return next(ijson.items(f, section, use_float=True), _MISSING)
+
+    with open(config_path, 'rb') as f:
+        content = f.read()
+    config_data = (orjson.loads(content) if ORJSON_AVAILABLE
+                   else json.loads(content))
+    if not isinstance(config_data, dict):
+        return _MISSING
+    return config_data.get(section, _MISSING)
+
+
+def read_env_file(env_path: str = '.env') -> Dict[str, str]:
+    """
+    解析.env文件为字典（支持引号、export前缀和行内注释），文件未修改时直接返回缓存结果
+
+    Args:
+        env_path: .env文件路径
+
+    Returns:
+        Dict[str, str]: 键值字典，文件不存在时返回空字典
+    """
+    try:
+        mtime = os.stat(env_path).st_mtime_ns
+    except OSError:
+        return {}
+
+    key = (os.path.abspath(env_path), mtime)
+    parsed = _env_cache.get(key)
+    if parsed is None:
+        parsed = {name: value
+                  for name, value in dotenv_values(env_path).items()
+                  if value is not None}
+        # 同一路径只保留最新一次解析结果
+        for old_key in [k for k in _env_cache if k[0] == key[0]]:
+            del _env_cache[old_key]
+        _env_cache[key] = parsed
+    return dict(parsed)
+
 class ConfigHandler:
     """
     配置处理类
@@ -31,15 +107,12 @@ class ConfigHandler:
                 logger.error(f"配置文件不存在: {config_path}")
                 return False, {}
                 
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+            oss_config = _read_config_section(config_path, 'oss')
                 
             # 检查是否包含OSS配置部分
-            if 'oss' not in config_data:
+            if oss_config is _MISSING:
                 logger.error(f"配置文件中不包含OSS配置部分: {config_path}")
                 return False, {}
-                
-            oss_config = config_data['oss']
             
             # 验证OSS配置
             if ConfigHandler.validate_oss_config(oss_config):
@@ -10,7 +10,9 @@ import time
 import logging
 import json
 import requests
-from typing import Dict, List, Any, Optional, Union
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Any, Optional, Union, Iterator
 
 # 导入官方SDK
 try:
@@ -19,10 +21,92 @@ try:
     SDK_AVAILABLE = True
 except ImportError:
     SDK_AVAILABLE = False
+
+# 可选：流式解析转写结果JSON
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# 可选：更快的JSON解析库
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 导入轮询配置
+try:
+    from src.config.settings import (DASHSCOPE_POLL_INITIAL,
+                                     DASHSCOPE_POLL_MAX,
+                                     DASHSCOPE_POLL_TIMEOUT)
+except ImportError:
+    DASHSCOPE_POLL_INITIAL = 1.0
+    DASHSCOPE_POLL_MAX = 15.0
+    DASHSCOPE_POLL_TIMEOUT = 600.0
     
 # 设置日志
 logger = logging.getLogger(__name__)
 
+
+def _load_transcription_json(response: requests.Response) -> Any:
+    """
+    解析转写结果JSON。安装了ijson时边下载边解析，并跳过用不到的逐字时间戳（words），
+    不需要先把完整响应读入内存，长视频的峰值内存明显降低；否则优先用orjson整体解析
+
+    参数:
+        response: 转写结果的HTTP响应（ijson可用时应以stream=True请求）
+
+    返回:
+        解析后的JSON数据
+    """
+    if not IJSON_AVAILABLE:
+        if ORJSON_AVAILABLE:
+            return orjson.loads(response.content)
+        return response.json()
+
+    try:
+        response.raw.decode_content = True
+        builder = ijson.ObjectBuilder()
+        skip_prefix = None
+        for prefix, event, value in ijson.parse(response.raw):
+            if skip_prefix is not None:
+                if (prefix == skip_prefix
+                        or prefix.startswith(skip_prefix + '.')):
+                    continue
+                skip_prefix = None
+            if event == 'map_key' and value == 'words':
+                skip_prefix = f"{prefix}.words" if prefix else 'words'
+                continue
+            builder.event(event, value)
+        return builder.value
+    finally:
+        response.close()
+
+
+def backoff_intervals(initial: float = None, maximum: float = None,
+                      timeout: float = None) -> Iterator[float]:
+    """
+    生成转写任务轮询的等待间隔：从initial开始每次翻倍，不超过maximum，累计等待达到timeout后结束
+
+    参数:
+        initial: 首次等待间隔（秒），默认读取配置 DASHSCOPE_POLL_INITIAL
+        maximum: 最大等待间隔（秒），默认读取配置 DASHSCOPE_POLL_MAX
+        timeout: 总等待时间上限（秒），默认读取配置 DASHSCOPE_POLL_TIMEOUT
+
+    返回:
+        等待间隔迭代器
+    """
+    interval = initial if initial is not None else DASHSCOPE_POLL_INITIAL
+    maximum = maximum if maximum is not None else DASHSCOPE_POLL_MAX
+    timeout = timeout if timeout is not None else DASHSCOPE_POLL_TIMEOUT
+    elapsed = 0.0
+    while elapsed < timeout:
+        yield interval
+        elapsed += interval
+        interval = min(interval * 2, maximum)
+
 class DashScopeSDKWrapper:
     """DashScope SDK包装类"""
     
@@ -33,6 +117,19 @@ class DashScopeSDKWrapper:
         参数:
             api_key: API密钥，如果为None则尝试从环境变量获取
         """
+        # 复用同一个会话下载转写结果，连接池保持到OSS的连接，避免每次重新握手；
+        # 限流和服务端临时错误自动退避重试，重试用尽后返回最后一次响应，由调用方raise_for_status
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.5,
+                              status_forcelist=(429, 500, 502, 503, 504),
+                              raise_on_status=False)
+        )
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+
         if not SDK_AVAILABLE:
             logger.error("DashScope SDK未安装，请使用pip install dashscope安装")
             return
@@ -63,16 +160,19 @@ class DashScopeSDKWrapper:
         try:
             # 下载转写结果
             logger.info(f"下载转写结果: {url}")
-            response = requests.get(url, timeout=30)
+            response = self.http.get(url, timeout=30, stream=IJSON_AVAILABLE)
             
-            # 检查响应
-            if response.status_code != 200:
-                logger.error(f"下载转写结果失败: {response.status_code}")
+            # 检查响应（重定向已由会话跟随，其余非2xx状态均视为失败）
+            try:
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                logger.error(f"下载转写结果失败: {str(e)}")
+                response.close()
                 return []
                 
             # 解析JSON数据
             try:
-                data = response.json()
+                data = _load_transcription_json(response)
                 logger.info(f"转写结果数据格式: {type(data)}")
                 
                 # 检查数据格式
@@ -353,20 +453,13 @@ class DashScopeSDKWrapper:
             }
             
         try:
-            # 配置参数
-            params = {}
-            
-            # 添加热词表ID（如果提供）
+            # 配置参数：采样率和标点符号参数，热词表ID（如果提供）
+            params = {"sample_rate": sample_rate, "punctuation": punctuation}
             if vocabulary_id:
                 params["vocabulary_id"] = vocabulary_id
-                
-            # 添加采样率和标点符号参数
-            params["sample_rate"] = sample_rate
-            params["punctuation"] = punctuation
             
-            # 添加其他参数
-            for key, value in kwargs.items():
-                params[key] = value
+            # 其他参数整体合并覆盖默认值，无需逐键赋值
+            params.update(kwargs)
                 
             logger.info(f"转写音频文件: {file_url}, 模型: {model}, 热词ID: {vocabulary_id}")
             
@@ -519,10 +612,7 @@ class DashScopeSDKWrapper:
                 # 改用手动轮询方式
                 logger.info("使用轮询方式查询任务状态")
                 
-                max_retry = 60  # 最多轮询60次
-                retry_interval = 10  # 每10秒查询一次
-                
-                for i in range(max_retry):
+                for i, retry_interval in enumerate(backoff_intervals()):
                     # 查询任务状态
                     logger.info(f"第 {i+1} 次查询任务状态")
                     query_response = Transcription.fetch(task_id)
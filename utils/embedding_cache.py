@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文本向量磁盘缓存：按 (模型名, 精度/后端, 文本SHA-256) 持久化已计算的句向量，重复分析同一批字幕时无需再次编码
+
+每个模型的每种精度/后端对应一个只追加的float16向量文件（内存映射读取）和一个sqlite清单（文本哈希 -> 行号）
+"""
+
+import os
+import re
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join('data', 'cache', 'embeddings')
+
+# 磁盘上以半精度存储，读写带宽减半
+STORAGE_DTYPE = np.float16
+
+_stores: Dict[Tuple[str, str], "EmbeddingStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class EmbeddingLRU:
+    """线程安全的内存向量缓存（按最近使用淘汰），供多个编码线程共享"""
+
+    def __init__(self, maxsize: int):
+        """
+        初始化缓存
+
+        参数:
+            maxsize: 最多保留的条目数
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, np.ndarray]:
+        """
+        批量读取缓存，命中的条目标记为最近使用
+
+        参数:
+            keys: 缓存键
+
+        返回:
+            {键: 向量}，只包含命中的键
+        """
+        hits = {}
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key)
+                if value is not None:
+                    self._data.move_to_end(key)
+                    hits[key] = value
+        return hits
+
+    def put_many(self, items: Dict[Hashable, np.ndarray]) -> None:
+        """
+        批量写入缓存，超出容量时淘汰最久未使用的条目
+
+        参数:
+            items: {键: 向量}
+        """
+        with self._lock:
+            self._data.update(items)
+            for key in items:
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _text_hash(text: str) -> str:
+    """计算文本的SHA-256摘要"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingStore:
+    """单个模型（及精度/后端）的向量磁盘缓存"""
+
+    def __init__(self, model_name: str, cache_dir: str = CACHE_DIR,
+                 variant: str = 'float32'):
+        """
+        初始化向量缓存
+
+        参数:
+            model_name: 模型名称，不同模型的向量分开存储
+            cache_dir: 缓存目录
+            variant: 模型精度/后端（如 float32、float16、onnx-int8），
+                同名模型的不同变体向量分开存储
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        safe_name = re.sub(r'[^0-9A-Za-z._-]', '_', f"{model_name}.{variant}")
+        self.data_path = os.path.join(cache_dir, f"{safe_name}.f16")
+        self.manifest_path = os.path.join(cache_dir, f"{safe_name}.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.manifest_path,
+                                     check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta "
+                           "(key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rows "
+                           "(hash TEXT PRIMARY KEY, row INTEGER)")
+        self._conn.commit()
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._mmap = None
+        self._mmap_rows = 0
+        max_row = self._conn.execute("SELECT MAX(row) FROM rows").fetchone()[0]
+        self._expected_rows = 0 if max_row is None else max_row + 1
+        self._check_consistency()
+
+    def _check_consistency(self) -> None:
+        """向量文件被删除或截断时，清单中的行号已失效，整体重建（运行期间也会检查）"""
+        if self._expected_rows <= self._row_count():
+            return
+        logger.warning(f"向量缓存文件与清单不一致，重建缓存: {self.data_path}")
+        self._conn.execute("DELETE FROM rows")
+        self._conn.commit()
+        self._mmap = None
+        self._mmap_rows = 0
+        self._expected_rows = 0
+        if os.path.exists(self.data_path):
+            os.remove(self.data_path)
+
+    def _row_count(self) -> int:
+        """向量文件中已写入的行数"""
+        if not self.dim:
+            return 0
+        try:
+            row_bytes = self.dim * np.dtype(STORAGE_DTYPE).itemsize
+            return os.path.getsize(self.data_path) // row_bytes
+        except OSError:
+            return 0
+
+    def _rows_view(self, rows: int) -> np.ndarray:
+        """以内存映射方式读取前rows行，文件增长后重新映射"""
+        if self._mmap is None or self._mmap_rows < rows:
+            self._mmap = np.memmap(self.data_path, dtype=STORAGE_DTYPE,
+                                   mode='r', shape=(rows, self.dim))
+            self._mmap_rows = rows
+        return self._mmap
+
+    def get_or_encode(self, texts: List[str],
+                      encode_func: Callable[[List[str]], np.ndarray]
+                      ) -> np.ndarray:
+        """
+        获取文本向量，只对缓存中没有的文本调用编码函数，并把新结果追加到磁盘
+
+        参数:
+            texts: 文本列表（应已去重）
+            encode_func: 编码函数，输入文本列表，返回形状 (len, dim) 的向量数组
+
+        返回:
+            与texts一一对应的float32向量数组（经半精度存储，命中与未命中的结果一致）
+        """
+        if not texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+
+        hashes = [_text_hash(text) for text in texts]
+        with self._lock:
+            self._check_consistency()
+            positions = {}
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                positions.update(self._conn.execute(
+                    f"SELECT hash, row FROM rows "
+                    f"WHERE hash IN ({placeholders})", chunk
+                ).fetchall())
+
+            missing = [i for i, h in enumerate(hashes) if h not in positions]
+            if missing:
+                embeddings = np.asarray(
+                    encode_func([texts[i] for i in missing]),
+                    dtype=STORAGE_DTYPE)
+                if self.dim is None:
+                    self.dim = int(embeddings.shape[1])
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta VALUES ('dim', ?)",
+                        (str(self.dim),))
+                first_row = self._row_count()
+                with open(self.data_path, 'ab') as f:
+                    f.write(np.ascontiguousarray(embeddings).tobytes())
+                new_rows = [(hashes[i], first_row + offset)
+                            for offset, i in enumerate(missing)]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO rows VALUES (?, ?)", new_rows)
+                self._conn.commit()
+                positions.update(new_rows)
+                self._expected_rows = max(self._expected_rows,
+                                          first_row + len(missing))
+                logger.info(f"向量缓存新增 {len(missing)} 条，"
+                            f"命中 {len(texts) - len(missing)} 条")
+
+            view = self._rows_view(self._row_count())
+            return np.asarray(view[[positions[h] for h in hashes]],
+                              dtype=np.float32)
+
+
+def get_store(model_name: str, variant: str = 'float32') -> EmbeddingStore:
+    """
+    获取模型对应的向量缓存（进程内单例）
+
+    参数:
+        model_name: 模型名称
+        variant: 模型精度/后端
+
+    返回:
+        EmbeddingStore 实例
+    """
+    key = (model_name, variant)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = EmbeddingStore(model_name, variant=variant)
+            _stores[key] = store
+        return store
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+视频元数据缓存：按 (路径, 修改时间, 文件大小) 缓存ffprobe探测结果，避免重复启动子进程
+"""
+
+import os
+import json
+import atexit
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Callable, Iterator, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = os.path.join('data', 'cache', 'metadata_cache.json')
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.mov', '.m4v', '.avi'})
+
+_cache: Optional[Dict[str, Dict[str, Any]]] = None
+_dirty = False
+# 临时文件（如剪辑中间片段）的缓存条目：只保留在内存中，不写回磁盘，超出上限时淘汰最久未用的条目
+TRANSIENT_CACHE_SIZE = 256
+_transient: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _load_cache() -> Dict[str, Dict[str, Any]]:
+    """加载缓存文件（仅首次调用时读取磁盘）"""
+    global _cache
+    if _cache is None:
+        _cache = {}
+        try:
+            if os.path.exists(CACHE_FILE):
+                with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                    _cache = json.load(f)
+        except Exception as e:
+            logger.warning(f"加载元数据缓存失败: {str(e)}")
+            _cache = {}
+    return _cache
+
+
+def save_cache() -> None:
+    """将有变更的缓存写回磁盘"""
+    global _dirty
+    with _lock:
+        if not _dirty or _cache is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+            with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(_cache, f, ensure_ascii=False)
+            _dirty = False
+        except Exception as e:
+            logger.warning(f"保存元数据缓存失败: {str(e)}")
+
+
+def get_or_fetch(file_path: str, fetch_func: Callable[[str], Dict[str, Any]],
+                 stat: Optional[os.stat_result] = None
+                 ) -> Optional[Dict[str, Any]]:
+    """
+    获取视频元数据，文件未变化时直接返回缓存结果
+
+    参数:
+        file_path: 视频文件路径
+        fetch_func: 缓存未命中时调用的探测函数，如 video_fix_tools.get_video_info
+        stat: 已有的文件状态（如 DirEntry.stat()），传入时不再重复stat
+
+    返回:
+        元数据字典，文件不存在时返回None
+    """
+    global _dirty
+    if stat is None:
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            logger.error(f"无法读取文件状态: {file_path}, {str(e)}")
+            return None
+
+    key = os.path.abspath(file_path)
+    with _lock:
+        entry = _transient.get(key)
+        if entry is not None:
+            _transient.move_to_end(key)
+        else:
+            entry = _load_cache().get(key)
+    if (entry and entry.get('mtime') == stat.st_mtime
+            and entry.get('size') == stat.st_size):
+        return entry['metadata']
+
+    metadata = fetch_func(file_path)
+    # 探测失败的结果不缓存，下次重新探测
+    if metadata and 'error' not in metadata:
+        with _lock:
+            _load_cache()[key] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'metadata': metadata
+            }
+            _dirty = True
+    return metadata
+
+
+def put(file_path: str, metadata: Dict[str, Any],
+        transient: bool = False) -> None:
+    """
+    直接写入已知的元数据（如刚生成的中间文件），后续 get_or_fetch 不再调用ffprobe
+
+    参数:
+        file_path: 视频文件路径（文件需已写入完成）
+        metadata: 元数据字典，格式与 video_fix_tools.get_video_info 的返回值一致
+        transient: 是否为临时文件，临时文件的条目只保留在内存中且数量有上限
+    """
+    global _dirty
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        logger.warning(f"无法读取文件状态，跳过写入元数据缓存: {file_path}, {str(e)}")
+        return
+    key = os.path.abspath(file_path)
+    entry = {
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'metadata': dict(metadata, size_bytes=stat.st_size)
+    }
+    with _lock:
+        if transient:
+            _transient[key] = entry
+            _transient.move_to_end(key)
+            while len(_transient) > TRANSIENT_CACHE_SIZE:
+                _transient.popitem(last=False)
+        else:
+            _load_cache()[key] = entry
+            _dirty = True
+
+
+def iter_video_entries(root: str) -> Iterator[os.DirEntry]:
+    """
+    递归遍历目录下的视频文件，返回自带stat缓存的DirEntry
+
+    参数:
+        root: 根目录
+
+    返回:
+        视频文件DirEntry迭代器
+    """
+    # 用队列逐层遍历代替递归生成器，同一时刻只打开一个目录句柄；
+    # DirEntry的类型判断直接使用目录项自带的d_type，不额外stat
+    splitext = os.path.splitext
+    extensions = VIDEO_EXTENSIONS
+    pending = deque([root])
+    while pending:
+        directory = pending.popleft()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif (splitext(entry.name)[1].lower() in extensions
+                          and entry.is_file()):
+                        yield entry
+        except OSError as e:
+            logger.warning(f"遍历目录失败: {directory}, {str(e)}")
+
+
+def iter_directory(root: str, fetch_func: Callable[[str], Dict[str, Any]],
+                   max_workers: Optional[int] = None
+                   ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    边遍历目录边获取视频元数据，逐个产出结果，同时在途的探测任务数有上限，内存占用与目录规模无关
+
+    参数:
+        root: 根目录
+        fetch_func: 缓存未命中时调用的探测函数
+        max_workers: 并发探测线程数，默认按CPU核数计算（探测在子进程中完成，线程仅负责等待）
+
+    返回:
+        (视频路径, 元数据) 迭代器，探测失败的文件不产出
+    """
+    workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    max_pending = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def drain(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    metadata = future.result()
+                except Exception as e:
+                    logger.warning(f"获取视频元数据失败: {path}, {str(e)}")
+                    continue
+                if metadata and 'error' not in metadata:
+                    yield path, metadata
+
+        for entry in iter_video_entries(root):
+            future = executor.submit(get_or_fetch, entry.path, fetch_func,
+                                     entry.stat())
+            pending[future] = entry.path
+            if len(pending) >= max_pending:
+                yield from drain(FIRST_COMPLETED)
+        while pending:
+            yield from drain(FIRST_COMPLETED)
+
+
+def scan_directory(root: str, fetch_func: Callable[[str], Dict[str, Any]],
+                   max_workers: Optional[int] = None
+                   ) -> Dict[str, Dict[str, Any]]:
+    """
+    扫描目录下所有视频并获取元数据，每个文件只stat一次，缓存未命中的探测并发执行
+
+    参数:
+        root: 根目录
+        fetch_func: 缓存未命中时调用的探测函数
+        max_workers: 并发探测线程数
+
+    返回:
+        {视频路径: 元数据}
+    """
+    return dict(iter_directory(root, fetch_func, max_workers))
+
+
+atexit.register(save_cache)
@@ -5,10 +5,13 @@
 视频处理器模块：提供视频处理、音频处理、字幕提取等功能。
 """
 
+import io
 import os
 import re
 import json
 import time
+import atexit
+import weakref
 import logging
 import tempfile
 import subprocess
@@ -20,6 +23,7 @@ logger = logging.getLogger(__name__)
 
 # 从utils导入DashScope API SDK包装器
 from .dashscope_sdk_wrapper import dashscope_sdk
+from . import temp_cleanup, video_utils
 
 # 导入配置
 try:
@@ -45,6 +49,98 @@ try:
 except ImportError:
     OSS_AVAILABLE = False
 
+# 可选：更快的JSON序列化库，用于读写字幕缓存
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 需要先提取音频再转写的视频扩展名
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.flv', '.webm'})
+
+# 提取出的临时音频目录
+AUDIO_TEMP_DIR = os.path.join('data', 'temp', 'audio')
+
+# 字幕输出目录，文件名格式为 {视频名}_{时间戳}.srt / {视频名}_{时间戳}_subtitles.json
+SUBTITLE_OUTPUT_DIR = os.path.join("data", "processed", "subtitles")
+
+# 字幕缓存文件：每行一条 {缓存键: 字幕列表} 记录，新增只追加一行，值为null表示删除；
+# 行数超过有效条目数的两倍时整体重写压缩。旧版整体JSON文件仅在迁移时读取一次
+AUDIO_CACHE_FILE = os.path.join('data', 'cache', 'audio_cache.ndjson')
+_LEGACY_AUDIO_CACHE_FILE = os.path.join('data', 'cache', 'audio_cache.json')
+
+# 字幕缓存两次写盘的最小间隔（秒），间隔内的修改只标记待写，每次提取字幕结束时统一落盘
+CACHE_FLUSH_INTERVAL = 2.0
+
+
+def _file_size(file_path: str) -> int:
+    """获取文件大小，文件不存在时返回-1（只调用一次stat，不先exists再getsize）"""
+    try:
+        return os.stat(file_path).st_size
+    except OSError:
+        return -1
+
+
+def _dumps_line(record: Dict[str, Any]) -> bytes:
+    """将一条缓存记录序列化为一行UTF-8 JSON（含换行符）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(record) + b'\n'
+    return json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def _dumps(obj: Any, pretty: bool = False) -> bytes:
+    """将对象序列化为UTF-8 JSON，默认紧凑输出，pretty为True时缩进2格便于人工查看"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    """解析UTF-8 JSON数据"""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+_processors: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _flush_all_audio_caches() -> None:
+    """进程退出时写回所有处理器中尚未落盘的字幕缓存"""
+    for processor in list(_processors):
+        processor.flush_audio_cache()
+
+
+atexit.register(_flush_all_audio_caches)
+
+
+class ResponseWrapper:
+    """
+    将SDK包装器或HTTP接口返回的字典包装成与DashScope响应对象一致的结构，
+    供 _parse_paraformer_response 统一解析（模块级定义，避免每次转写重新创建类）
+    """
+    __slots__ = ("status_code", "output", "request_id")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.status_code = data.get("status_code", 200)
+        self.output = data.get("output", {})
+        self.request_id = data.get("request_id", "unknown")
+
+        # 添加错误信息
+        if "error" in data:
+            if self.output is None:
+                self.output = {"error": data["error"]}
+            else:
+                self.output["error"] = data["error"]
+
+        # 处理SDK包装器返回的数据
+        if "sentences" in data:
+            if self.output is None:
+                self.output = {}
+            self.output["sentences"] = data["sentences"]
+
 class VideoProcessor:
     """视频处理器，处理视频转换、字幕生成等功能"""
     
@@ -55,40 +151,115 @@ class VideoProcessor:
         
         # 初始化缓存
         self.audio_cache = {}
+        # 自上次写盘后修改过的缓存键、缓存文件当前行数、是否需要整体重写
+        self._pending_cache_keys = set()
+        self._cache_lines = 0
+        self._cache_needs_rewrite = False
         self._load_audio_cache()
+        self._cache_dirty = False
+        self._last_cache_flush = 0.0
+        _processors.add(self)
     
     def _ensure_directories(self):
         """确保必要的目录结构存在"""
         directories = [
-            os.path.join('data', 'temp', 'audio'),
+            AUDIO_TEMP_DIR,
             os.path.join('data', 'temp', 'videos'),
             os.path.join('data', 'cache', 'audio'),
-            os.path.join('data', 'processed', 'subtitles')
+            SUBTITLE_OUTPUT_DIR
         ]
         
         for directory in directories:
-            os.makedirs(directory, exist_ok=True)
+            self._ensure_dir(directory)
+
+    def _ensure_dir(self, directory: str) -> None:
+        """确保目录存在"""
+        video_utils.ensure_dir(directory)
     
     def _load_audio_cache(self):
-        """加载音频处理缓存"""
-        cache_path = os.path.join('data', 'cache', 'audio_cache.json')
+        """加载音频处理缓存，逐行回放NDJSON记录；只有旧版JSON文件时读取后在下次保存时迁移"""
+        self.audio_cache = {}
         try:
-            if os.path.exists(cache_path):
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    self.audio_cache = json.load(f)
+            if os.path.exists(AUDIO_CACHE_FILE):
+                with open(AUDIO_CACHE_FILE, 'rb') as f:
+                    for line in f:
+                        self._cache_lines += 1
+                        try:
+                            record = _loads(line)
+                        except ValueError:
+                            # 写入中断留下的残行，下次保存时整体重写
+                            self._cache_needs_rewrite = True
+                            continue
+                        for cache_key, value in record.items():
+                            if value is None:
+                                self.audio_cache.pop(cache_key, None)
+                            else:
+                                self.audio_cache[cache_key] = value
+            elif os.path.exists(_LEGACY_AUDIO_CACHE_FILE):
+                with open(_LEGACY_AUDIO_CACHE_FILE, 'rb') as f:
+                    self.audio_cache = _loads(f.read())
+                self._cache_needs_rewrite = True
         except Exception as e:
             logger.warning(f"加载音频缓存失败: {str(e)}")
             self.audio_cache = {}
     
-    def _save_audio_cache(self):
-        """保存音频处理缓存"""
-        cache_path = os.path.join('data', 'cache', 'audio_cache.json')
+    def _update_audio_cache(self, cache_key: str,
+                            subtitles: Optional[List[Dict[str, Any]]]):
+        """
+        更新单个缓存条目并保存
+
+        参数:
+            cache_key: 缓存键
+            subtitles: 字幕数据，为None时删除该条目
+        """
+        if subtitles is None:
+            self.audio_cache.pop(cache_key, None)
+        else:
+            self.audio_cache[cache_key] = subtitles
+        self._pending_cache_keys.add(cache_key)
+        self._save_audio_cache()
+
+    def _save_audio_cache(self, force: bool = False):
+        """
+        保存音频处理缓存：只追加修改过的条目，文件膨胀到有效条目数两倍以上时整体重写；
+        距上次写盘不足 CACHE_FLUSH_INTERVAL 秒时只标记为待写
+
+        参数:
+            force: 为True时忽略写盘间隔，立即写盘
+        """
+        since_flush = time.monotonic() - self._last_cache_flush
+        if not force and since_flush < CACHE_FLUSH_INTERVAL:
+            self._cache_dirty = True
+            return
         try:
-            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(self.audio_cache, f, ensure_ascii=False, indent=2)
+            self._ensure_dir(os.path.dirname(AUDIO_CACHE_FILE))
+            pending = list(self._pending_cache_keys)
+            self._pending_cache_keys.clear()
+            live_entries = max(len(self.audio_cache), 1)
+            if (self._cache_needs_rewrite
+                    or self._cache_lines + len(pending) > 2 * live_entries):
+                # 压缩：写入临时文件后原子替换
+                tmp_path = AUDIO_CACHE_FILE + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(b''.join(_dumps_line({k: v})
+                                     for k, v in self.audio_cache.items()))
+                os.replace(tmp_path, AUDIO_CACHE_FILE)
+                self._cache_lines = len(self.audio_cache)
+                self._cache_needs_rewrite = False
+            elif pending:
+                with open(AUDIO_CACHE_FILE, 'ab') as f:
+                    f.write(b''.join(_dumps_line({k: self.audio_cache.get(k)})
+                                     for k in pending))
+                self._cache_lines += len(pending)
+            self._cache_dirty = False
+            self._last_cache_flush = time.monotonic()
         except Exception as e:
             logger.warning(f"保存音频缓存失败: {str(e)}")
+
+    def flush_audio_cache(self):
+        """立即写回尚未落盘的字幕缓存"""
+        if self._cache_dirty:
+            self._save_audio_cache(force=True)
             
     def _get_cache_key(self, video_file: str) -> str:
         """获取缓存键"""
@@ -118,8 +289,8 @@ class VideoProcessor:
                 return None
                 
             # 生成输出音频文件路径
-            audio_dir = os.path.join('data', 'temp', 'audio')
-            os.makedirs(audio_dir, exist_ok=True)
+            audio_dir = AUDIO_TEMP_DIR
+            self._ensure_dir(audio_dir)
             
             file_name = os.path.basename(video_file)
             base_name = os.path.splitext(file_name)[0]
@@ -151,8 +322,8 @@ class VideoProcessor:
                 logger.error(f"提取音频失败: {result.stderr}")
                 return None
                 
-            # 检查输出文件
-            if not os.path.exists(audio_file) or os.path.getsize(audio_file) == 0:
+            # 检查输出文件（一次stat同时判断存在与大小）
+            if _file_size(audio_file) <= 0:
                 logger.error(f"生成的音频文件不存在或为空: {audio_file}")
                 return None
                 
@@ -208,8 +379,8 @@ class VideoProcessor:
                 logger.error(f"音频格式转换失败: {result.stderr}")
                 return None
                 
-            # 检查输出文件
-            if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+            # 检查输出文件（一次stat同时判断存在与大小）
+            if _file_size(output_file) <= 0:
                 logger.error(f"生成的标准音频文件不存在或为空: {output_file}")
                 return None
                 
@@ -283,12 +454,7 @@ class VideoProcessor:
         参数:
             temp_file: 临时文件路径
         """
-        if temp_file and os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-                logger.info(f"已清理临时文件: {temp_file}")
-            except Exception as e:
-                logger.warning(f"清理临时文件失败: {str(e)}")
+        temp_cleanup.schedule_removal(temp_file)
     
     def _format_time(self, seconds: float) -> str:
         """格式化时间为HH:MM:SS格式"""
@@ -299,11 +465,15 @@ class VideoProcessor:
         
     def _format_time_srt(self, seconds: float) -> str:
         """格式化时间为SRT格式：HH:MM:SS,mmm"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        seconds_int = int(seconds % 60)
-        milliseconds = int((seconds - int(seconds)) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{seconds_int:02d},{milliseconds:03d}"
+        return self._format_ms_srt(int(round(seconds * 1000)))
+
+    @staticmethod
+    def _format_ms_srt(ms: int) -> str:
+        """将整数毫秒格式化为SRT格式：HH:MM:SS,mmm（全程整数运算，无浮点舍入误差）"""
+        seconds, ms = divmod(ms, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
     
     def _parse_paraformer_response(self, response) -> List[Dict[str, Any]]:
         """
@@ -500,6 +670,17 @@ class VideoProcessor:
         返回:
             字幕列表
         """
+        try:
+            return self._extract_subtitles_with_cache(video_file,
+                                                      vocabulary_id)
+        finally:
+            # 本次提取产生的缓存修改立即落盘，不依赖进程退出时的atexit（处理器实例可能先被回收）
+            self.flush_audio_cache()
+
+    def _extract_subtitles_with_cache(self, video_file: str,
+                                      vocabulary_id: str = None
+                                      ) -> List[Dict[str, Any]]:
+        """查询字幕缓存，未命中时提取音频并转写，结果写入缓存（写盘由调用方统一完成）"""
         logger.info(f"从视频中提取字幕: {video_file}")
         
         # 检查缓存
@@ -514,7 +695,7 @@ class VideoProcessor:
             else:
                 # 如果缓存的不是字幕数据而是文件路径，则清除这个缓存项
                 logger.warning(f"缓存项 {cache_key} 不是字幕数据，将重新处理")
-                del self.audio_cache[cache_key]
+                self._update_audio_cache(cache_key, None)
         
         # 检查文件是否存在
         if not os.path.exists(video_file):
@@ -523,7 +704,7 @@ class VideoProcessor:
         
         # 如果是视频文件，提取音频
         file_ext = os.path.splitext(video_file)[1].lower()
-        if file_ext in ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.webm']:
+        if file_ext in VIDEO_EXTENSIONS:
             audio_file = self.extract_audio(video_file)
             if not audio_file:
                 logger.error(f"从视频提取音频失败: {video_file}")
@@ -532,99 +713,10 @@ class VideoProcessor:
             # 假设是音频文件
             audio_file = video_file
         
-        # 定义API响应包装类
-        class ResponseWrapper:
-            def __init__(self, data):
-                self.status_code = data.get("status_code", 200)
-                self.output = data.get("output", {})
-                self.request_id = data.get("request_id", "unknown")
-                
-                # 添加错误信息
-                if "error" in data:
-                    if self.output is None:
-                        self.output = {"error": data["error"]}
-                    else:
-                        self.output["error"] = data["error"]
-                        
-                # 处理SDK包装器返回的数据
-                if "sentences" in data:
-                    if self.output is None:
-                        self.output = {}
-                    self.output["sentences"] = data["sentences"]
-        
         # 上传音频文件到可访问的URL
         audio_file_url = self._upload_to_accessible_url(audio_file)
         if not audio_file_url:
             logger.error(f"上传音频文件失败: {audio_file}")
-            
-            # 尝试直接使用文件内容
-            try:
-                if os.path.exists(audio_file) and os.path.getsize(audio_file) < 10 * 1024 * 1024:
-                    with open(audio_file, 'rb') as f:
-                        audio_content = f.read()
-                        logger.info(f"读取音频文件内容，大小: {len(audio_content)} 字节")
-                        
-                        # 使用API进行识别
-                        response_data = dashscope_sdk.call_transcription(
-                            model="paraformer-v2",
-                            file_content=audio_content,
-                            vocabulary_id=vocabulary_id,
-                            sample_rate=16000,
-                            format_type="streaming",
-                            punctuation=True
-                        )
-                        
-                        # 包装响应
-                        response = ResponseWrapper(response_data)
-                        
-                        # 检查响应
-                        if response.output and 'results' in response.output:
-                            subtitles = self._parse_paraformer_response(response)
-                            
-                            # 缓存结果
-                            self.audio_cache[cache_key] = subtitles
-                            self._save_audio_cache()
-                            
-                            return subtitles
-            except Exception as e:
-                logger.error(f"使用文件内容识别失败: {str(e)}")
-                
-            # 尝试转换为标准音频格式
-            try:
-                std_audio_file = self._convert_to_standard_audio(audio_file)
-                if std_audio_file and os.path.exists(std_audio_file):
-                    with open(std_audio_file, 'rb') as f:
-                        std_audio_content = f.read()
-                        
-                        # 使用API进行识别
-                        response_data = dashscope_sdk.call_transcription(
-                            model="paraformer-v2",
-                            file_content=std_audio_content,
-                            vocabulary_id=vocabulary_id,
-                            sample_rate=16000,
-                            format_type="streaming",
-                            punctuation=True
-                        )
-                        
-                        # 包装响应
-                        response = ResponseWrapper(response_data)
-                        
-                        # 检查响应
-                        if response.output and 'results' in response.output:
-                            subtitles = self._parse_paraformer_response(response)
-                            
-                            # 清理临时文件
-                            self._cleanup_temp_files(std_audio_file)
-                            
-                            # 缓存结果
-                            self.audio_cache[cache_key] = subtitles
-                            self._save_audio_cache()
-                            
-                            return subtitles
-            except Exception as e:
-                logger.error(f"使用标准音频格式识别失败: {str(e)}")
-            
-            # 所有方法都失败
             return []
         
         # 尝试使用SDK调用方式
@@ -649,113 +741,16 @@ class VideoProcessor:
                 subtitles = self._parse_paraformer_response(wrapper_response)
                 
                 # 缓存结果
-                self.audio_cache[cache_key] = subtitles
-                self._save_audio_cache()
+                self._update_audio_cache(cache_key, subtitles)
                 
                 return subtitles
             else:
                 error = result.get("error", "未知错误")
                 logger.error(f"SDK转写音频失败: {error}")
-                
-                # 当SDK调用失败时，回退到HTTP API调用
-                logger.info("尝试回退到HTTP API调用")
-        except Exception as e:
-            logger.exception(f"SDK转写过程中出错: {str(e)}")
-            logger.info("尝试回退到HTTP API调用")
-        
-        # 使用异步方式调用API (原有的HTTP API调用方式保持不变)
-        try:
-            # 1. 提交异步转写任务
-            response_data = dashscope_sdk.call_transcription(
-                model="paraformer-v2",
-                file_urls=[audio_file_url],
-                vocabulary_id=vocabulary_id,
-                sample_rate=16000,
-                format_type="non-streaming",  # 使用非流式模式，即异步模式
-                punctuation=True
-            )
-            
-            # 检查是否请求成功
-            if response_data.get("status_code") != 200:
-                error_code = response_data.get("error", {}).get("code", "UNKNOWN_ERROR")
-                error_message = response_data.get("error", {}).get("message", "未知错误")
-                logger.error(f"提交转写任务失败: {error_code} - {error_message}")
                 return []
-            
-            # 2. 获取任务ID
-            task_id = response_data.get("output", {}).get("task_id")
-            if not task_id:
-                logger.error("未获取到有效的任务ID")
-                return []
-                
-            logger.info(f"转写任务已提交，任务ID: {task_id}")
-            
-            # 3. 轮询任务状态，直到完成或失败
-            max_retry = 60  # 最多轮询60次，约等待10分钟
-            retry_interval = 10  # 每次轮询间隔10秒
-            
-            for i in range(max_retry):
-                # 查询任务状态
-                task_result = dashscope_sdk.get_transcription_result(task_id)
-                
-                if task_result.get("status_code") != 200:
-                    logger.error(f"查询任务状态失败: {task_result.get('error', {})}")
-                    # 继续轮询，可能是临时网络问题
-                    time.sleep(retry_interval)
-                    continue
-                
-                # 获取任务状态
-                task_status = task_result.get("output", {}).get("status", "UNKNOWN")
-                logger.info(f"任务状态: {task_status}，第 {i+1} 次查询")
-                
-                # 根据任务状态处理
-                if task_status == "SUCCEEDED":
-                    # 任务成功完成
-                    logger.info("转写任务已完成")
-                    
-                    # 获取转写结果
-                    result_data = task_result.get("output", {})
-                    
-                    # 包装结果以便复用现有的解析逻辑
-                    wrapper_response = ResponseWrapper({"status_code": 200, "output": result_data})
-                    
-                    # 解析结果
-                    subtitles = self._parse_paraformer_response(wrapper_response)
-                    
-                    # 缓存结果
-                    self.audio_cache[cache_key] = subtitles
-                    self._save_audio_cache()
-                    
-                    return subtitles
-                    
-                elif task_status == "FAILED":
-                    # 任务失败
-                    error_code = task_result.get("output", {}).get("error_code", "UNKNOWN_ERROR")
-                    error_message = task_result.get("output", {}).get("error_message", "未知错误")
-                    logger.error(f"转写任务失败: {error_code} - {error_message}")
-                    return []
-                    
-                elif task_status in ["PENDING", "RUNNING"]:
-                    # 任务仍在进行中，继续等待
-                    time.sleep(retry_interval)
-                    continue
-                    
-                else:
-                    # 未知状态
-                    logger.warning(f"遇到未知任务状态: {task_status}")
-                    time.sleep(retry_interval)
-            
-            # 超过最大轮询次数
-            logger.error(f"转写任务超时，超过最大等待时间: {max_retry * retry_interval}秒")
-            return []
-        
         except Exception as e:
-            logger.exception(f"转写过程中出错: {str(e)}")
+            logger.exception(f"SDK转写过程中出错: {str(e)}")
             return []
-            
-        # 如果执行到这里，说明出现了未处理的情况
-        logger.error("转写过程异常结束")
-        return []
     
     def process_video_file(self, video_file: str, vocabulary_id: str = None, format_type: str = "all") -> Dict[str, str]:
         """
@@ -780,8 +775,8 @@ class VideoProcessor:
             optimized_subtitles = self._optimize_subtitles(subtitles)
             
             # 准备输出
-            output_dir = os.path.join("data", "processed", "subtitles")
-            os.makedirs(output_dir, exist_ok=True)
+            output_dir = SUBTITLE_OUTPUT_DIR
+            self._ensure_dir(output_dir)
             
             # 生成文件名
             base_name = os.path.splitext(os.path.basename(video_file))[0]
@@ -902,34 +897,27 @@ class VideoProcessor:
             subtitles: 字幕数据
             srt_file: 输出SRT文件路径
         """
-        with open(srt_file, 'w', encoding='utf-8') as f:
-            for i, subtitle in enumerate(subtitles):
-                # SRT索引从1开始
-                index = i + 1
-                
-                # 获取时间信息
-                start_time = subtitle.get('start', 0)
-                end_time = subtitle.get('end', 0)
-                
-                # 转换为SRT时间格式 (00:00:00,000)
-                start_formatted = self._format_time_srt(start_time)
-                end_formatted = self._format_time_srt(end_time)
-                
-                # 获取文本
-                text = subtitle.get('text', '')
-                
-                # 写入SRT格式
-                f.write(f"{index}\n")
-                f.write(f"{start_formatted} --> {end_formatted}\n")
-                f.write(f"{text}\n\n")
-            
-    def _save_json_file(self, subtitles: List[Dict[str, Any]], json_file: str) -> None:
+        # 字幕块依次写入同一个内存缓冲区，不保留逐块字符串列表，最后整体写入文件
+        fmt = self._format_time_srt
+        buffer = io.StringIO()
+        for index, subtitle in enumerate(subtitles, 1):
+            buffer.write(f"{index}\n{fmt(subtitle.get('start', 0))} --> "
+                         f"{fmt(subtitle.get('end', 0))}\n"
+                         f"{subtitle.get('text', '')}\n\n")
+        srt_content = buffer.getvalue()
+        # 整体编码为UTF-8后以二进制写入，绕过文本层的分块编码
+        with open(srt_file, 'wb') as f:
+            f.write(srt_content.encode('utf-8'))
+
+    def _save_json_file(self, subtitles: List[Dict[str, Any]], json_file: str,
+                        pretty: bool = False) -> None:
         """
         保存字幕为JSON格式
         
         参数:
             subtitles: 字幕数据
             json_file: 输出JSON文件路径
+            pretty: 是否缩进输出（仅供人工查看，默认紧凑格式以减少读写量）
         """
         # 只保留必要的字段，以保持与现有格式一致
         export_data = []
@@ -941,9 +929,11 @@ class VideoProcessor:
                 "end_time": subtitle.get('end', 0)
             })
             
-        # 写入JSON文件
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, ensure_ascii=False, indent=2)
+        # 先写临时文件再原子替换，中途失败不会留下读取方无法解析的半截文件
+        tmp_path = json_file + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_dumps(export_data, pretty))
+        os.replace(tmp_path, json_file)
 
     def clear_cache(self, video_file: str = None):
         """
@@ -956,12 +946,14 @@ class VideoProcessor:
             # 清除指定视频文件的缓存
             cache_key = self._get_cache_key(video_file)
             if cache_key in self.audio_cache:
-                del self.audio_cache[cache_key]
+                self._update_audio_cache(cache_key, None)
                 logger.info(f"已清除视频 {video_file} 的缓存")
         else:
             # 清除所有缓存
             self.audio_cache = {}
+            self._pending_cache_keys.clear()
+            self._cache_needs_rewrite = True
             logger.info("已清除所有缓存")
         
         # 保存缓存
-        self._save_audio_cache()
+        self._save_audio_cache(force=True)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+临时文件后台清理：删除操作交给守护线程执行，避免在慢速文件系统上阻塞主流程
+"""
+
+import os
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from typing import Optional
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+
+def _remove(path: str) -> None:
+    """删除文件或目录，不存在时忽略"""
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        else:
+            return
+        logger.info(f"已清理临时文件: {path}")
+    except Exception as e:
+        logger.warning(f"清理临时文件失败: {path}, {str(e)}")
+
+
+def _drain() -> None:
+    """后台线程：依次删除队列中的路径，收到None时退出"""
+    for path in iter(_queue.get, None):
+        _remove(path)
+        _queue.task_done()
+    _queue.task_done()
+
+
+def schedule_removal(path: Optional[str]) -> None:
+    """
+    将临时文件或目录加入后台删除队列，立即返回
+
+    参数:
+        path: 要删除的文件或目录路径，为空时忽略
+    """
+    global _worker
+    if not path:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_drain, name="temp-cleanup",
+                                       daemon=True)
+            _worker.start()
+    _queue.put(path)
+
+
+def flush(timeout: float = 10.0) -> None:
+    """
+    等待队列中的删除操作完成并停止后台线程（进程退出时自动调用）
+
+    参数:
+        timeout: 最长等待时间（秒）
+    """
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is None:
+        return
+    _queue.put(None)
+    worker.join(timeout)
+
+
+atexit.register(flush)
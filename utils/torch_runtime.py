@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PyTorch推理运行环境：统一选择推理设备，并在进程内缓存已加载的模型，供各文本向量模型加载时使用
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+import torch
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# CPU推理的线程上限：超过物理核数后线程争用反而变慢
+TORCH_MAX_THREADS = 8
+TORCH_INTEROP_THREADS = 2
+
+
+def configure_threads():
+    """
+    设置torch的CPU线程数；已通过OMP_NUM_THREADS显式配置时尊重环境变量
+
+    返回:
+        实际使用的intra-op线程数
+    """
+    if os.environ.get("OMP_NUM_THREADS"):
+        return torch.get_num_threads()
+    threads = min(TORCH_MAX_THREADS, os.cpu_count() or 1)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+    except RuntimeError:
+        # 已有并行任务运行后不能再修改inter-op线程数
+        pass
+    logger.debug(f"torch CPU线程数设置为 {threads}")
+    return threads
+
+
+configure_threads()
+
+
+def select_device() -> str:
+    """
+    选择推理设备，优先CUDA，其次Apple MPS，否则使用CPU
+
+    返回:
+        设备名称: "cuda"、"mps" 或 "cpu"
+    """
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def prepare_model(model, device: str):
+    """
+    将模型移动到指定设备，CUDA上转为半精度（显存减半并可使用Tensor Core）
+
+    参数:
+        model: torch.nn.Module 模型（含 SentenceTransformer）
+        device: 设备名称
+
+    返回:
+        处理后的模型
+    """
+    model.to(device)
+    if str(device).startswith("cuda"):
+        model.half()
+        logger.info("模型已切换为FP16半精度推理")
+    return model
+
+
+# 进程内已加载模型缓存：键由调用方给出（模型类型、名称、设备等），多个服务实例共享同一份权重
+_MODEL_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cached_model(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """
+    获取缓存的模型，未命中时调用loader加载并缓存
+
+    加载在锁内进行（双重检查），并发的首次请求不会重复加载同一个模型；
+    loader抛出的异常原样向上传递，失败结果不缓存
+
+    参数:
+        key: 缓存键
+        loader: 无参加载函数，返回加载好的模型
+
+    返回:
+        模型对象
+    """
+    model = _MODEL_CACHE.get(key)
+    if model is not None:
+        return model
+    with _CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = loader()
+            _MODEL_CACHE[key] = model
+    return model
+
+
+def purge_model_cache(kind: Optional[str] = None) -> int:
+    """
+    清理模型缓存，长时间运行的进程可借此释放不再使用的模型
+
+    参数:
+        kind: 只清理键的第一个元素等于kind的条目（如 "bert"），为None时全部清理
+
+    返回:
+        清理的条目数
+    """
+    with _CACHE_LOCK:
+        keys = [key for key in _MODEL_CACHE
+                if kind is None
+                or (isinstance(key, tuple) and key and key[0] == kind)]
+        for key in keys:
+            del _MODEL_CACHE[key]
+    if keys and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    logger.info(f"已清理 {len(keys)} 个缓存模型")
+    return len(keys)
@@ -231,7 +231,10 @@ def get_video_info(video_path: str) -> Dict[str, Any]:
         if audio_streams:
             audio_stream = audio_streams[0]
             result_info["audio_info"] = {
-                "codec": audio_stream.get("codec_name")
+                "codec": audio_stream.get("codec_name"),
+                "sample_rate": (int(audio_stream.get("sample_rate") or 0)
+                                or None),
+                "channels": audio_stream.get("channels")
             }
             
         return result_info
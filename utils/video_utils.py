@@ -4,14 +4,20 @@
 视频处理工具模块：提供视频下载和基础视频处理功能
 """
 import os
+import bisect
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import cv2
 import tempfile
 import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tqdm import tqdm
-from typing import Optional, Tuple, Dict, List, Union, Any
+from typing import Optional, Tuple, Dict, List, Union, Any, Callable
 from urllib.parse import urlparse
 import shutil
 import urllib.parse
@@ -21,6 +27,33 @@ from datetime import datetime
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# URL路径中可识别为视频的扩展名（小写）
+_VIDEO_URL_EXTENSIONS = frozenset({'.mp4', '.mov', '.avi', '.mkv', '.webm',
+                                   '.flv', '.wmv'})
+
+# 视频下载与URL校验共用的HTTP会话，连接池复用keep-alive连接；
+# 限流和服务端临时错误自动退避重试，重试用尽后返回最后一次响应，由调用方raise_for_status
+_http = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      raise_on_status=False)
+)
+_http.mount('http://', _http_adapter)
+_http.mount('https://', _http_adapter)
+
+
+def ensure_dir(directory: str) -> None:
+    """
+    确保目录存在（已存在时不报错）
+
+    参数:
+        directory: 目录路径
+    """
+    os.makedirs(directory, exist_ok=True)
+
 class VideoUtils:
     """视频处理工具类，提供视频下载、格式检测和URL验证功能"""
     
@@ -48,7 +81,7 @@ class VideoUtils:
             if not output_dir:
                 output_dir = os.path.join("data", "temp", "downloaded")
             
-            os.makedirs(output_dir, exist_ok=True)
+            ensure_dir(output_dir)
             
             # 从URL中提取文件名
             if not filename:
@@ -77,7 +110,7 @@ class VideoUtils:
             start_time = time.time()
             
             # 下载文件
-            with requests.get(url, stream=True, timeout=timeout) as response:
+            with _http.get(url, stream=True, timeout=timeout) as response:
                 response.raise_for_status()  # 确保请求成功
                 
                 # 获取内容长度（如果有）
@@ -136,7 +169,7 @@ class VideoUtils:
             
         try:
             # 尝试获取文件头，不下载完整内容
-            response = requests.head(url, timeout=10)
+            response = _http.head(url, timeout=10)
             
             # 检查状态码
             if response.status_code != 200:
@@ -147,10 +180,9 @@ class VideoUtils:
             if content_type.startswith('video/'):
                 return True
                 
-            # 如果内容类型不明确，检查文件扩展名
-            video_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.wmv']
+            # 如果内容类型不明确，检查文件扩展名（一次集合查找）
             url_path = urllib.parse.urlparse(url).path.lower()
-            if any(url_path.endswith(ext) for ext in video_extensions):
+            if os.path.splitext(url_path)[1] in _VIDEO_URL_EXTENSIONS:
                 return True
                 
             return False
@@ -227,6 +259,56 @@ class VideoUtils:
             logger.error(f"获取视频信息失败: {str(e)}")
             return None
 
+
+def is_nonempty_file(file_path: str) -> bool:
+    """
+    判断文件是否存在且非空，只调用一次stat（不先exists再getsize）
+
+    参数:
+        file_path: 文件路径
+
+    返回:
+        文件存在且大小大于0时返回True
+    """
+    try:
+        return os.stat(file_path).st_size > 0
+    except OSError:
+        return False
+
+
+def copy_files(pairs: List[Tuple[str, str]], max_workers: int = 8,
+               preserve_metadata: bool = False) -> List[str]:
+    """
+    并行复制多个文件（IO密集，各文件互不依赖）
+
+    shutil.copyfile 在Linux上走os.sendfile内核态复制，这里只负责并发调度；
+    中间文件不需要保留时间戳和权限，默认省去copy2额外的stat/utime/chmod
+
+    参数:
+        pairs: (源路径, 目标路径) 列表，目标须为文件路径
+        max_workers: 最大并发线程数
+        preserve_metadata: 是否同时复制时间戳和权限等元数据
+
+    返回:
+        复制失败的源文件路径列表
+    """
+    if not pairs:
+        return []
+    copy_func = shutil.copy2 if preserve_metadata else shutil.copyfile
+
+    def _copy(pair: Tuple[str, str]) -> Optional[str]:
+        src, dst = pair
+        try:
+            copy_func(src, dst)
+            return None
+        except Exception as e:
+            logger.error(f"复制文件失败: {src} -> {dst}, {str(e)}")
+            return src
+
+    workers = min(max_workers, len(pairs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [src for src in executor.map(_copy, pairs) if src is not None]
+
 def validate_video_file(file_path: str) -> bool:
     """
     验证视频文件是否有效
@@ -238,13 +320,12 @@ def validate_video_file(file_path: str) -> bool:
         文件有效则返回True，否则返回False
     """
     try:
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
+        # 检查文件是否存在及大小（一次stat）
+        try:
+            file_size = os.stat(file_path).st_size
+        except FileNotFoundError:
             logger.error(f"文件不存在: {file_path}")
             return False
-            
-        # 检查文件大小
-        file_size = os.path.getsize(file_path)
         if file_size == 0:
             logger.error(f"文件大小为0: {file_path}")
             return False
@@ -355,6 +436,609 @@ def get_video_info(file_path: str) -> Dict[str, Any]:
         logger.exception(f"获取视频信息失败: {str(e)}")
         return {}
 
+
+# FFmpeg能力探测结果缓存，进程内只探测一次；多线程同时首次调用时由锁保证只启动一次探测子进程
+_FFMPEG_CAPABILITIES: Optional[Dict[str, bool]] = None
+_probe_lock = threading.RLock()
+
+
+def check_ffmpeg() -> Dict[str, bool]:
+    """
+    检查FFmpeg是否可用，并探测是否支持NVENC/VideoToolbox硬件编码
+
+    返回:
+        能力字典，格式为 {"ffmpeg": 是否可用, "nvenc": 是否支持h264_nvenc,
+        "videotoolbox": 是否支持h264_videotoolbox}
+    """
+    global _FFMPEG_CAPABILITIES
+    if _FFMPEG_CAPABILITIES is not None:
+        return _FFMPEG_CAPABILITIES
+    with _probe_lock:
+        if _FFMPEG_CAPABILITIES is None:
+            _FFMPEG_CAPABILITIES = _probe_ffmpeg()
+    return _FFMPEG_CAPABILITIES
+
+
+def _probe_ffmpeg() -> Dict[str, bool]:
+    """启动FFmpeg子进程探测可用的编码器（由check_ffmpeg加锁调用）"""
+    capabilities = {"ffmpeg": False, "nvenc": False, "videotoolbox": False}
+    if shutil.which('ffmpeg'):
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-encoders'],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            encoders = result.stdout if result.returncode == 0 else ''
+            capabilities["ffmpeg"] = result.returncode == 0
+            capabilities["nvenc"] = 'h264_nvenc' in encoders
+            capabilities["videotoolbox"] = 'h264_videotoolbox' in encoders
+        except Exception as e:
+            logger.warning(f"探测FFmpeg编码器失败: {str(e)}")
+    else:
+        logger.warning("未找到FFmpeg可执行文件")
+
+    if capabilities["nvenc"]:
+        logger.info("检测到NVENC硬件编码器，裁剪视频将优先使用GPU")
+
+    return capabilities
+
+
+# 硬件加速配置，首次调用detect_hwaccel时探测；空字典表示没有可用的硬件加速
+HWACCEL: Optional[Dict[str, Optional[str]]] = None
+
+
+def detect_hwaccel() -> Dict[str, Optional[str]]:
+    """
+    探测可用的硬件解码/编码方式（结果缓存在HWACCEL中）
+
+    优先级: CUDA解码+NVENC编码 > VideoToolbox(macOS) > VAAPI解码(Linux)。
+    VAAPI编码需要把帧上传到显存（hwupload），与CPU滤镜链衔接复杂，
+    因此只用于解码，编码仍用libx264。
+
+    返回:
+        {"hwaccel": -hwaccel参数值, "encoder": 硬件编码器名或None}，
+        不支持时返回空字典
+    """
+    global HWACCEL
+    if HWACCEL is not None:
+        return HWACCEL
+    with _probe_lock:
+        if HWACCEL is None:
+            HWACCEL = _probe_hwaccel()
+    return HWACCEL
+
+
+def _probe_hwaccel() -> Dict[str, Optional[str]]:
+    """启动FFmpeg子进程探测硬件加速方式（由detect_hwaccel加锁调用）"""
+    hwaccel: Dict[str, Optional[str]] = {}
+    capabilities = check_ffmpeg()
+    if capabilities["ffmpeg"]:
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-hwaccels'],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            methods = (set(result.stdout.split()[1:])
+                       if result.returncode == 0 else set())
+            if 'cuda' in methods and capabilities["nvenc"]:
+                hwaccel = {"hwaccel": "cuda", "encoder": "h264_nvenc"}
+            elif 'videotoolbox' in methods and capabilities["videotoolbox"]:
+                hwaccel = {"hwaccel": "videotoolbox",
+                           "encoder": "h264_videotoolbox"}
+            elif ('vaapi' in methods
+                  and os.path.exists('/dev/dri/renderD128')):
+                hwaccel = {"hwaccel": "vaapi", "encoder": None}
+        except Exception as e:
+            logger.warning(f"探测FFmpeg硬件加速失败: {str(e)}")
+
+    if hwaccel:
+        logger.info(f"检测到硬件加速: {hwaccel['hwaccel']}，"
+                    f"编码器: {hwaccel['encoder'] or 'libx264'}")
+
+    return hwaccel
+
+
+def _decode_args(hwaccel: Dict[str, Optional[str]]) -> List[str]:
+    """放在每个 -i 之前的硬件解码参数（解码后的帧回到内存，供CPU滤镜使用）"""
+    return ['-hwaccel', hwaccel['hwaccel']] if hwaccel.get('hwaccel') else []
+
+
+def _encoder_args(hwaccel: Dict[str, Optional[str]]) -> List[str]:
+    """与libx264 -crf 22画质大致相当的视频编码参数"""
+    encoder = hwaccel.get('encoder')
+    if encoder == 'h264_nvenc':
+        return ['-c:v', 'h264_nvenc', '-preset', 'p4', '-cq', '22']
+    if encoder == 'h264_videotoolbox':
+        return ['-c:v', 'h264_videotoolbox', '-q:v', '65']
+    return ['-c:v', 'libx264', '-preset', 'fast', '-crf', '22']
+
+
+def _run_encode(build_cmd: Callable[[Dict[str, Optional[str]]], List[str]],
+                use_gpu: bool, action: str) -> bool:
+    """
+    执行编码命令，硬件加速失败时自动回退到CPU编码
+
+    参数:
+        build_cmd: 根据硬件加速配置生成FFmpeg命令的函数
+        use_gpu: 是否尝试硬件加速
+        action: 日志中的操作名称
+
+    返回:
+        命令是否执行成功
+    """
+    hwaccel = detect_hwaccel() if use_gpu else {}
+    attempts = [hwaccel, {}] if hwaccel else [{}]
+    for attempt in attempts:
+        try:
+            result = subprocess.run(build_cmd(attempt), capture_output=True,
+                                    text=True)
+        except Exception as e:
+            logger.error(f"{action}时出错: {str(e)}")
+            return False
+        if result.returncode == 0:
+            return True
+        if attempt:
+            logger.warning(f"{action}使用硬件加速失败，回退到CPU编码: "
+                           f"{result.stderr[-500:]}")
+        else:
+            logger.error(f"{action}失败: {result.stderr}")
+    return False
+
+
+def get_fast_temp_root(fallback: str, min_free_bytes: int = 1 << 30) -> str:
+    """
+    选择存放中间文件的临时目录，优先使用内存文件系统（TMPDIR 或 /dev/shm），
+    减少磁盘写入
+
+    参数:
+        fallback: 没有合适的内存文件系统时使用的目录
+        min_free_bytes: 候选目录至少需要的剩余空间，默认1GB
+
+    返回:
+        临时文件根目录
+    """
+    candidates = [os.environ.get('TMPDIR'), '/dev/shm']
+    for candidate in candidates:
+        if (not candidate or not os.path.isdir(candidate)
+                or not os.access(candidate, os.W_OK)):
+            continue
+        try:
+            if shutil.disk_usage(candidate).free < min_free_bytes:
+                continue
+        except OSError:
+            continue
+        temp_root = os.path.join(candidate, 'ai_video_master')
+        try:
+            os.makedirs(temp_root, exist_ok=True)
+        except OSError:
+            continue
+        logger.info(f"中间文件将写入内存文件系统: {temp_root}")
+        return temp_root
+    return fallback
+
+
+# 关键帧时间戳缓存: {(视频路径, 修改时间, 文件大小): 升序排列的关键帧时间列表}，
+# 同一路径的文件被覆盖后键随之变化；超出上限时淘汰最久未用的条目
+KEYFRAME_CACHE_SIZE = 128
+_KEYFRAME_CACHE: "OrderedDict[Tuple[str, int, int], List[float]]" = (
+    OrderedDict())
+_keyframe_lock = threading.Lock()
+
+
+def get_keyframe_times(video_path: str) -> List[float]:
+    """
+    获取视频所有关键帧的时间戳（按路径、修改时间和文件大小缓存）
+
+    参数:
+        video_path: 视频文件路径
+
+    返回:
+        升序排列的关键帧时间列表，失败返回空列表
+    """
+    try:
+        stat = os.stat(video_path)
+    except OSError as e:
+        logger.warning(f"获取关键帧失败，无法读取文件状态: {video_path}, "
+                       f"{str(e)}")
+        return []
+    key = (os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size)
+    with _keyframe_lock:
+        cached = _KEYFRAME_CACHE.get(key)
+        if cached is not None:
+            _KEYFRAME_CACHE.move_to_end(key)
+            return cached
+
+    keyframes: List[float] = []
+    try:
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-select_streams', 'v:0',
+            '-skip_frame', 'nokey',
+            '-show_entries', 'frame=pts_time',
+            '-of', 'csv=p=0',
+            video_path
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True,
+                                timeout=60)
+        if result.returncode == 0:
+            for line in result.stdout.splitlines():
+                value = line.strip().rstrip(',')
+                if value and value != 'N/A':
+                    keyframes.append(float(value))
+            keyframes.sort()
+        else:
+            logger.warning(f"获取关键帧失败: {result.stderr}")
+    except Exception as e:
+        logger.warning(f"获取关键帧时出错: {str(e)}")
+
+    with _keyframe_lock:
+        _KEYFRAME_CACHE[key] = keyframes
+        while len(_KEYFRAME_CACHE) > KEYFRAME_CACHE_SIZE:
+            _KEYFRAME_CACHE.popitem(last=False)
+    return keyframes
+
+
+def nearest_keyframe(video_path: str, start_time: float) -> Optional[float]:
+    """
+    查找不晚于指定时间的最近关键帧
+
+    参数:
+        video_path: 视频文件路径
+        start_time: 目标开始时间（秒）
+
+    返回:
+        关键帧时间（秒），找不到则返回None
+    """
+    keyframes = get_keyframe_times(video_path)
+    index = bisect.bisect_right(keyframes, start_time)
+    if index == 0:
+        return None
+    return keyframes[index - 1]
+
+
+def build_concat_list(video_paths: List[str]) -> str:
+    """
+    生成FFmpeg concat demuxer所需的文件列表内容
+
+    参数:
+        video_paths: 按顺序拼接的视频路径列表
+
+    返回:
+        列表文本
+    """
+    # 路径中的单引号需按 '\'' 转义，否则concat demuxer会解析失败
+    lines = ["file '{}'".format(os.path.abspath(path).replace("'", "'\\''"))
+             for path in video_paths]
+    return '\n'.join(lines) + '\n'
+
+
+def write_concat_list(video_paths: List[str], list_path: str) -> None:
+    """
+    生成FFmpeg concat demuxer所需的文件列表
+
+    参数:
+        video_paths: 按顺序拼接的视频路径列表
+        list_path: 列表文件输出路径
+    """
+    with open(list_path, 'w', encoding='utf-8') as f:
+        f.write(build_concat_list(video_paths))
+
+
+def concat_videos(clips_list: Union[str, List[str]], output_path: str) -> bool:
+    """
+    使用concat demuxer流复制拼接视频（要求各片段编码参数一致）
+
+    参数:
+        clips_list: 按顺序拼接的视频路径列表（通过标准输入传给FFmpeg，不落盘），
+            或已有的列表文件路径
+        output_path: 输出视频路径
+
+    返回:
+        拼接是否成功
+    """
+    if isinstance(clips_list, str):
+        list_input, list_text = clips_list, None
+    else:
+        list_input, list_text = 'pipe:0', build_concat_list(clips_list)
+
+    cmd = [
+        'ffmpeg', '-y',
+        '-f', 'concat', '-safe', '0',
+        '-protocol_whitelist', 'file,pipe',
+        '-i', list_input,
+        '-c', 'copy',
+        output_path
+    ]
+    try:
+        result = subprocess.run(cmd, input=list_text, capture_output=True,
+                                text=True)
+        if result.returncode != 0:
+            logger.error(f"拼接视频失败: {result.stderr}")
+            return False
+        return is_nonempty_file(output_path)
+    except Exception as e:
+        logger.error(f"拼接视频时出错: {str(e)}")
+        return False
+
+
+def _normalize_video_filter(index: int, width: int, height: int, fps: float,
+                            fade_duration: float = 0,
+                            duration: Optional[float] = None) -> str:
+    """
+    构造第index路输入的统一尺寸/帧率滤镜，可附带淡入淡出
+
+    参数:
+        index: 输入序号
+        width: 输出宽度
+        height: 输出高度
+        fps: 输出帧率
+        fade_duration: 淡入/淡出时长（秒），为0时不加淡变效果
+        duration: 片段时长，提供时才添加淡出效果
+
+    返回:
+        滤镜字符串（不含输出标签）
+    """
+    video_filter = (
+        f"[{index}:v]scale={width}:{height}"
+        f":force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+        f"setsar=1,fps={fps},format=yuv420p"
+    )
+    if fade_duration > 0:
+        video_filter += f",fade=t=in:st=0:d={fade_duration}"
+        if duration and duration > fade_duration * 2:
+            fade_start = duration - fade_duration
+            video_filter += (f",fade=t=out:st={fade_start:.3f}"
+                             f":d={fade_duration}")
+    return video_filter
+
+
+def concat_with_fades(video_paths: List[str], output_path: str, width: int,
+                      height: int, fps: float = 30,
+                      transition_duration: float = 0.5,
+                      durations: Optional[List[float]] = None,
+                      include_audio: bool = True,
+                      use_gpu: bool = True) -> bool:
+    """
+    使用单个filter_complex完成缩放、淡入淡出与拼接，只编码一次
+
+    参数:
+        video_paths: 按顺序拼接的视频路径列表
+        output_path: 输出视频路径
+        width: 输出宽度
+        height: 输出高度
+        fps: 输出帧率
+        transition_duration: 每个片段淡入/淡出时长（秒），为0时不加淡变效果
+        durations: 各片段时长，提供时才添加淡出效果
+        include_audio: 是否拼接音频（要求所有片段都有音轨）
+        use_gpu: 是否尝试硬件解码/编码
+
+    返回:
+        拼接是否成功
+    """
+    if not video_paths:
+        return False
+
+    # yuv420p要求宽高为偶数
+    width += width % 2
+    height += height % 2
+
+    filters = []
+    concat_inputs = []
+    for i in range(len(video_paths)):
+        duration = durations[i] if durations else None
+        video_filter = _normalize_video_filter(
+            i, width, height, fps, transition_duration, duration)
+        filters.append(f"{video_filter}[v{i}]")
+        concat_inputs.append(f"[v{i}]")
+
+        if include_audio:
+            filters.append(f"[{i}:a]aresample=44100,"
+                           f"aformat=channel_layouts=stereo[a{i}]")
+            concat_inputs.append(f"[a{i}]")
+
+    audio_count = 1 if include_audio else 0
+    filters.append(f"{''.join(concat_inputs)}concat=n={len(video_paths)}"
+                   f":v=1:a={audio_count}[v]"
+                   + ("[a]" if include_audio else ""))
+
+    def build_cmd(hwaccel: Dict[str, Optional[str]]) -> List[str]:
+        cmd = ['ffmpeg', '-y']
+        for path in video_paths:
+            cmd.extend([*_decode_args(hwaccel), '-i', path])
+        cmd.extend(['-filter_complex', ';'.join(filters), '-map', '[v]'])
+        if include_audio:
+            cmd.extend(['-map', '[a]', '-c:a', 'aac'])
+        cmd.extend([*_encoder_args(hwaccel), output_path])
+        return cmd
+
+    if not _run_encode(build_cmd, use_gpu, "滤镜拼接视频"):
+        return False
+    return is_nonempty_file(output_path)
+
+
+def cut_clip(video_path: str, start_time: float, end_time: float,
+             output_path: str, width: Optional[int] = None,
+             height: Optional[int] = None, fps: Optional[float] = None,
+             audio_sample_rate: int = 44100, audio_channels: int = 2,
+             use_gpu: bool = True) -> bool:
+    """
+    重新编码裁剪视频片段；给定宽高和帧率时统一分辨率、帧率、像素格式、
+    关键帧间隔和音频参数，使各片段可用concat demuxer流复制拼接。
+    硬件编码失败时自动回退CPU
+
+    参数:
+        video_path: 源视频路径
+        start_time: 开始时间（秒）
+        end_time: 结束时间（秒）
+        output_path: 输出片段路径
+        width: 统一输出宽度（与height、fps同时给出时生效）
+        height: 统一输出高度
+        fps: 统一输出帧率
+        audio_sample_rate: 统一参数时的音频采样率
+        audio_channels: 统一参数时的音频声道数
+        use_gpu: 是否尝试硬件解码/编码
+
+    返回:
+        裁剪是否成功
+    """
+    normalize_args = []
+    if width and height and fps:
+        normalize_args = [
+            "-vf", f"scale={width}:{height}"
+                   f":force_original_aspect_ratio=decrease,"
+                   f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
+                   f"setsar=1,fps={fps}",
+            "-pix_fmt", "yuv420p",
+            "-g", str(max(1, int(round(fps * 2)))),
+            "-ar", str(audio_sample_rate), "-ac", str(audio_channels)
+        ]
+
+    def build_cmd(hwaccel: Dict[str, Optional[str]]) -> List[str]:
+        return [
+            "ffmpeg", "-y",
+            *_decode_args(hwaccel), "-i", video_path,
+            "-ss", str(start_time),
+            "-to", str(end_time),
+            *normalize_args,
+            *_encoder_args(hwaccel), "-c:a", "aac",
+            output_path
+        ]
+
+    return _run_encode(build_cmd, use_gpu, "裁剪视频")
+
+
+def _escape_drawtext(text: str) -> str:
+    """转义drawtext滤镜中的特殊字符"""
+    for char in ('\\', ':', "'", '%', ','):
+        text = text.replace(char, '\\' + char)
+    return text
+
+
+def build_text_filter(text: str, font_size: int = 60, fg: str = 'white',
+                      font_path: Optional[str] = None,
+                      duration: Optional[float] = None, fade_in: float = 0,
+                      fade_out: float = 0) -> str:
+    """
+    构造居中文字的drawtext滤镜（可附带淡入淡出）
+
+    参数:
+        text: 文字内容
+        font_size: 字号
+        fg: 文字颜色
+        font_path: 字体文件路径（中文需指定支持中文的字体）
+        duration: 画面时长，添加淡出时需要
+        fade_in: 淡入时长（秒）
+        fade_out: 淡出时长（秒）
+
+    返回:
+        滤镜字符串
+    """
+    video_filter = (
+        f"drawtext=text='{_escape_drawtext(text)}'"
+        f":fontcolor={fg}:fontsize={font_size}"
+        f":x=(w-text_w)/2:y=(h-text_h)/2"
+    )
+    if font_path:
+        video_filter += f":fontfile='{font_path}'"
+    if fade_in > 0:
+        video_filter += f",fade=t=in:st=0:d={fade_in}"
+    if fade_out > 0 and duration:
+        fade_start = max(0, duration - fade_out)
+        video_filter += f",fade=t=out:st={fade_start:.3f}:d={fade_out}"
+    return video_filter
+
+
+def build_final_video(clip_paths: List[str], output_path: str, width: int,
+                      height: int, fps: float = 30,
+                      audio_path: Optional[str] = None,
+                      target_duration: Optional[float] = None,
+                      fade_duration: float = 0,
+                      durations: Optional[List[float]] = None,
+                      end_slate_text: Optional[str] = None,
+                      end_slate_duration: float = 0,
+                      font_path: Optional[str] = None,
+                      use_gpu: bool = True) -> bool:
+    """
+    用一次FFmpeg调用完成成片：统一片段尺寸、淡入淡出、追加片尾文字、
+    拼接、补齐时长并配上外部音轨
+
+    参数:
+        clip_paths: 按顺序拼接的片段路径列表
+        output_path: 输出视频路径
+        width: 输出宽度
+        height: 输出高度
+        fps: 输出帧率
+        audio_path: 外部音轨来源（如Demo视频），为None时不输出音频
+        target_duration: 目标时长，画面不足时定格最后一帧补齐，超出时截断
+        fade_duration: 每个片段的淡入/淡出时长（秒）
+        durations: 各片段时长，提供时才添加淡出效果
+        end_slate_text: 片尾文字，为None时不加片尾
+        end_slate_duration: 片尾时长（秒）
+        font_path: 片尾字体文件路径
+        use_gpu: 是否尝试硬件解码/编码
+
+    返回:
+        合成是否成功
+    """
+    if not clip_paths:
+        return False
+
+    # yuv420p要求宽高为偶数
+    width += width % 2
+    height += height % 2
+
+    filters = []
+    concat_inputs = []
+    for i in range(len(clip_paths)):
+        duration = durations[i] if durations else None
+        video_filter = _normalize_video_filter(
+            i, width, height, fps, fade_duration, duration)
+        filters.append(f"{video_filter}[v{i}]")
+        concat_inputs.append(f"[v{i}]")
+
+    # 片尾文字分支直接由lavfi生成，不产生中间文件
+    if end_slate_text and end_slate_duration > 0:
+        text_filter = build_text_filter(
+            end_slate_text, font_path=font_path, duration=end_slate_duration,
+            fade_in=fade_duration, fade_out=fade_duration)
+        filters.append(
+            f"color=c=black:s={width}x{height}:r={fps}"
+            f":d={end_slate_duration},{text_filter},format=yuv420p[slate]"
+        )
+        concat_inputs.append("[slate]")
+
+    concat_filter = (f"{''.join(concat_inputs)}"
+                     f"concat=n={len(concat_inputs)}:v=1:a=0")
+    if target_duration:
+        # 画面不足目标时长时定格最后一帧
+        concat_filter += (f",tpad=stop_mode=clone"
+                          f":stop_duration={target_duration:.3f}")
+    filters.append(f"{concat_filter}[v]")
+
+    def build_cmd(hwaccel: Dict[str, Optional[str]]) -> List[str]:
+        cmd = ['ffmpeg', '-y']
+        for path in clip_paths:
+            cmd.extend([*_decode_args(hwaccel), '-i', path])
+        if audio_path:
+            cmd.extend(['-i', audio_path])
+        cmd.extend(['-filter_complex', ';'.join(filters), '-map', '[v]'])
+        if audio_path:
+            cmd.extend(['-map', f"{len(clip_paths)}:a:0", '-c:a', 'aac'])
+        if target_duration:
+            cmd.extend(['-t', f"{target_duration:.3f}"])
+        cmd.extend([*_encoder_args(hwaccel), '-pix_fmt', 'yuv420p',
+                    output_path])
+        return cmd
+
+    if not _run_encode(build_cmd, use_gpu, "合成成片"):
+        return False
+    return is_nonempty_file(output_path)
+
 def format_duration(seconds: float) -> str:
     """
     将秒数格式化为时分秒格式
@@ -393,7 +1077,7 @@ def extract_frames(video_path: str,
             return []
             
         # 确保输出目录存在
-        os.makedirs(output_dir, exist_ok=True)
+        ensure_dir(output_dir)
         
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -444,7 +1128,7 @@ def download_video(url, target_path, filename=None, chunk_size=8192, retries=3,
         str: 下载完成的视频文件完整路径
     """
     # 确保目标目录存在
-    os.makedirs(target_path, exist_ok=True)
+    ensure_dir(target_path)
     
     # 如果未指定文件名，从URL中提取
     if not filename:
@@ -466,7 +1150,7 @@ def download_video(url, target_path, filename=None, chunk_size=8192, retries=3,
             logging.info(f"开始下载视频: {url} -> {file_path}")
             
             # 发起请求并获取文件大小
-            with requests.get(url, stream=True, timeout=30) as response:
+            with _http.get(url, stream=True, timeout=30) as response:
                 response.raise_for_status()
                 total_size = int(response.headers.get('content-length', 0))
                 
@@ -543,7 +1227,7 @@ def save_analysis_results(results, output_path=None, filename=None, format='json
         output_path = os.path.join('data', 'results')
     
     # 确保输出目录存在
-    os.makedirs(output_path, exist_ok=True)
+    ensure_dir(output_path)
     
     # 生成默认文件名
     if not filename: